@@ -1,12 +1,35 @@
-from flask import Flask, jsonify
+import os
+
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 
+from metrics import instrument_requests, render_metrics
+
 app = Flask(__name__)
 CORS(app, origins=["*"])
+instrument_requests(app)
 
 @app.route("/api/health")
 def health():
     return jsonify({"status": "ok", "message": "API Jéssica Santana funcionando!"})
 
+@app.route("/api/health/ready")
+def health_ready():
+    # Sem banco ou outros serviços: importado e atendendo, está pronto
+    response = jsonify({"status": "ready"})
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+@app.route("/metrics")
+def prometheus_metrics():
+    # Com METRICS_TOKEN definido exige "Authorization: Bearer <token>"
+    token = os.environ.get("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != "Bearer " + token:
+        return jsonify({"message": "Token inválido"}), 401
+    body, content_type = render_metrics()
+    response = app.response_class(body, content_type=content_type)
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+
+# Configuração de produção do gunicorn (Procfile e railway.json usam -c gunicorn.conf.py).
+# Workers e threads saem das CPUs e da memória do container; tudo pode ser
+# sobrescrito por variável de ambiente.
+
+
+def read_first(*paths):
+    for path in paths:
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            continue
+    return None
+
+
+def available_cpus():
+    # Limite do cgroup (v2 e v1) quando existir: os.cpu_count() enxerga todas as CPUs do host
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    quota = read_first("/sys/fs/cgroup/cpu.max")
+    if quota and not quota.startswith("max"):
+        limit, period = quota.split()[:2]
+        cpus = min(cpus, int(limit) / int(period))
+    else:
+        limit = read_first("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")
+        period = read_first("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+        if limit and period and int(limit) > 0:
+            cpus = min(cpus, int(limit) / int(period))
+    return max(1, int(cpus + 0.5))
+
+
+def available_memory_mb():
+    limit = read_first("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+    physical = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    memory = physical
+    if limit and limit.isdigit():
+        memory = min(int(limit), physical)
+    return memory // (1024 * 1024)
+
+
+cpus = available_cpus()
+memory_mb = available_memory_mb()
+# Memória estimada por worker (padrão: 160 MB), usada para limitar o número de workers
+worker_memory_mb = int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", 160))
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "5000")
+
+# 2 x CPUs + 1, limitado pela memória que cabe no container
+workers = int(os.environ.get("WEB_CONCURRENCY", max(1, min(2 * cpus + 1, memory_mb // worker_memory_mb))))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# App importado uma vez antes do fork: workers sobem mais rápido e compartilham memória
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+# Recicla workers periodicamente (com jitter para não reiniciarem todos juntos)
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG") or None
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+# Métricas do Prometheus (metrics.py) somadas entre os workers: cada processo
+# grava arquivos neste diretório, esvaziado a cada start do master. Sem
+# PROMETHEUS_MULTIPROC_DIR cada master cria o seu: outro gunicorn na mesma
+# máquina (o do loadtest.py, por exemplo) não apaga os arquivos deste. Vai
+# para o ambiente antes do import do app e do fork dos workers.
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="loja-metrics-")
+metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Contadores do worker encerrado continuam somando; o gauge de
+    # requisições em andamento deixa de contar com ele
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    server.log.info(
+        "%d workers gthread x %d threads (CPUs: %d, memória: %d MB)", workers, threads, cpus, memory_mb
+    )
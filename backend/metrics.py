@@ -0,0 +1,49 @@
+import os
+import time
+
+# Com vários workers do gunicorn cada processo grava seus valores em arquivos
+# mmap em PROMETHEUS_MULTIPROC_DIR (definido no gunicorn.conf.py) e o /metrics
+# soma os de todos. A variável precisa estar definida antes do import do
+# prometheus_client.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from flask import g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import generate_latest, multiprocess
+
+REQUESTS = Counter("http_requests_total", "Requisições HTTP atendidas", ["method", "route", "status"])
+LATENCY = Histogram("http_request_duration_seconds", "Duração das requisições HTTP", ["method", "route"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requisições em andamento", multiprocess_mode="livesum")
+
+
+def instrument_requests(app):
+    # Registrar antes dos outros hooks do app: este before_request roda
+    # primeiro e o after_request por último, já com o status final
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        IN_FLIGHT.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop("metrics_start", None)
+        if start is not None:
+            IN_FLIGHT.dec()
+            # Rota como registrada, não o path: um label por rota
+            rule = request.url_rule
+            route = rule.rule if rule is not None else "unmatched"
+            method = request.method
+            LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            REQUESTS.labels(method, route, str(response.status_code)).inc()
+        return response
+
+
+def render_metrics():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
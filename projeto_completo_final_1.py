@@ -83,6 +83,67 @@ pip install -r requirements.txt
 python app.py
 ```
 
+### Backend em modo assíncrono (opcional)
+Catálogo e health no event loop (aiosqlite/asyncpg), demais rotas no Flask:
+```bash
+cd backend
+flask --app app bootstrap
+uvicorn asgi:application --workers 2 --port 5000
+```
+
+### Schema e dados iniciais
+`flask --app app bootstrap` aplica as migrações e insere categorias, produtos
+de exemplo e o admin (senha em `ADMIN_PASSWORD`) só quando ainda não existem.
+Roda uma vez por deploy, antes de os novos containers subirem (`preDeployCommand`
+no railway.json, `release:` no Procfile); o start command é só o gunicorn, então
+um cold start não paga migrações nem seed. Sem `DATABASE_URL` (SQLite no disco
+do container) o gunicorn também roda o bootstrap ao subir, porque o banco do
+pre-deploy fica em outro container.
+
+### Consultas x tamanho do catálogo
+`flask --app app check-query-scaling` mede as consultas das listagens com os 6
+produtos do seed e de novo com 60.000 sintéticos, e falha se o número mudar.
+Altera o banco: rode contra um banco descartável já inicializado
+(`DATABASE_URL=sqlite:////tmp/escala.db flask --app app bootstrap` antes).
+
+### Prontidão e métricas
+- `/api/health/ready`: 503 enquanto o banco não responde (healthcheck do Railway)
+- `/metrics`: formato Prometheus, somado entre os workers do gunicorn; com
+  `METRICS_TOKEN` exige `Authorization: Bearer <token>`. No modo uvicorn com
+  vários workers, defina `PROMETHEUS_MULTIPROC_DIR` (diretório vazio) antes de subir.
+
+### Perfil sob demanda
+Só para administradores; a saída é texto "collapsed" (flamegraph.pl, speedscope):
+- Uma requisição: envie `X-Profile: 1` (e opcionalmente `X-Profile-Rate`, em Hz)
+  junto com o token; a resposta vira as pilhas amostradas da requisição.
+- Janela de tempo: `POST /api/admin/profile` com `{"seconds": 10, "rate": 100}`
+  amostra as threads ocupadas do worker que atendeu.
+- `PROFILER_ENABLED=0` remove as duas coisas; sem perfil em andamento o custo é zero.
+
+### Testes
+Rodam contra um SQLite temporário (na pasta backend):
+```bash
+pip install -r requirements-dev.txt
+pytest
+```
+
+Os testes também rodam `check-query-plans`, `check-query-budgets` e
+`check-query-scaling` (este em um banco próprio); o workflow
+`.github/workflows/backend.yml` roda tudo a cada push e pull request.
+
+### Teste de carga
+`python loadtest.py` (na pasta backend) sobe o gunicorn contra um SQLite
+temporário com catálogo sintético (`flask --app app seed-synthetic --products N`),
+repete a mistura do site (destaques da Home, listagem, categorias, produto e
+login) e mostra req/s e p50/p95/p99 por endpoint:
+```bash
+python loadtest.py --products 100000 --save-baseline   # grava loadtest-baseline.json
+python loadtest.py --products 100000                   # compara; sai com 1 se piorar mais que --threshold (10%)
+```
+`--db` reaproveita um catálogo grande entre execuções, `--server asgi` mede o
+modo uvicorn e `--mix` muda os pesos. O baseline só vale na mesma máquina e
+com os mesmos parâmetros.
+
 ### Frontend
 ```bash
 cd frontend
@@ -185,15 +246,48 @@ Thumbs.db
 *.sln
 *.sw?""")
 
+    # .github/workflows/backend.yml (testes do backend a cada push e PR)
+    create_file(f"{base}/.github/workflows/backend.yml", """name: Backend
+
+on:
+  push:
+  pull_request:
+
+jobs:
+  test:
+    runs-on: ubuntu-latest
+    defaults:
+      run:
+        working-directory: backend
+    steps:
+      - uses: actions/checkout@v4
+      - uses: actions/setup-python@v5
+        with:
+          python-version: '3.11'
+          cache: pip
+          cache-dependency-path: backend/requirements*.txt
+      - run: pip install -r requirements-dev.txt
+      # Inclui check-query-plans, check-query-budgets e check-query-scaling (tests/test_query_checks.py)
+      - run: pytest""")
+
     # ============ BACKEND COMPLETO ============
     
     # requirements.txt
     create_file(f"{base}/backend/requirements.txt", """Flask==3.1.1
+a2wsgi==1.10.7
+aiosqlite==0.20.0
+asyncpg==0.29.0
+Brotli==1.1.0
 flask-cors==6.0.0
 Flask-JWT-Extended==4.7.1
 Flask-SQLAlchemy==3.1.1
+greenlet==3.1.1
 gunicorn==21.2.0
+orjson==3.10.7
+prometheus-client==0.21.0
+psycopg[binary]==3.2.3
 python-dotenv==1.0.0
+uvicorn[standard]==0.30.6
 Werkzeug==3.1.3""")
 
     # railway.json
@@ -202,22 +296,184 @@ Werkzeug==3.1.3""")
     "builder": "NIXPACKS"
   },
   "deploy": {
-    "startCommand": "gunicorn -w 2 -b 0.0.0.0:$PORT app:app",
-    "healthcheckPath": "/api/health"
+    "preDeployCommand": ["flask --app app bootstrap"],
+    "startCommand": "gunicorn -c gunicorn.conf.py app:app",
+    "healthcheckPath": "/api/health/ready"
   }
 }""")
 
     # Procfile
-    create_file(f"{base}/backend/Procfile", """web: gunicorn -w 2 -b 0.0.0.0:$PORT app:app""")
+    create_file(f"{base}/backend/Procfile", """release: flask --app app bootstrap
+web: gunicorn -c gunicorn.conf.py app:app""")
+
+    # gunicorn.conf.py (workers/threads pelo tamanho do container)
+    create_file(f"{base}/backend/gunicorn.conf.py", """import os
+import shutil
+import tempfile
+
+# Configuração de produção do gunicorn (Procfile e railway.json usam -c gunicorn.conf.py).
+# Workers e threads saem das CPUs e da memória do container; tudo pode ser
+# sobrescrito por variável de ambiente.
+
+
+def read_first(*paths):
+    for path in paths:
+        try:
+            with open(path) as f:
+                return f.read().strip()
+        except OSError:
+            continue
+    return None
+
+
+def available_cpus():
+    # Limite do cgroup (v2 e v1) quando existir: os.cpu_count() enxerga todas as CPUs do host
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else (os.cpu_count() or 1)
+    quota = read_first('/sys/fs/cgroup/cpu.max')
+    if quota and not quota.startswith('max'):
+        limit, period = quota.split()[:2]
+        cpus = min(cpus, int(limit) / int(period))
+    else:
+        limit = read_first('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        period = read_first('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if limit and period and int(limit) > 0:
+            cpus = min(cpus, int(limit) / int(period))
+    return max(1, int(cpus + 0.5))
+
+
+def available_memory_mb():
+    limit = read_first('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes')
+    physical = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    memory = physical
+    if limit and limit.isdigit():
+        memory = min(int(limit), physical)
+    return memory // (1024 * 1024)
+
+
+cpus = available_cpus()
+memory_mb = available_memory_mb()
+# Memória estimada por worker (padrão: 160 MB), usada para limitar o número de workers
+worker_memory_mb = int(os.environ.get('GUNICORN_WORKER_MEMORY_MB', 160))
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '5000')
+
+# 2 x CPUs + 1, limitado pela memória que cabe no container
+workers = int(os.environ.get('WEB_CONCURRENCY', max(1, min(2 * cpus + 1, memory_mb // worker_memory_mb))))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# App importado uma vez antes do fork: workers sobem mais rápido e compartilham memória
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+# Recicla workers periodicamente (com jitter para não reiniciarem todos juntos)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+
+accesslog = os.environ.get('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+# Métricas do Prometheus (metrics.py) somadas entre os workers: cada processo
+# grava arquivos neste diretório, esvaziado a cada start do master. Sem
+# PROMETHEUS_MULTIPROC_DIR cada master cria o seu: outro gunicorn na mesma
+# máquina (o do loadtest.py, por exemplo) não apaga os arquivos deste. Vai
+# para o ambiente antes do import do app e do fork dos workers.
+if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+    os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='loja-metrics-')
+metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+
+
+def on_starting(server):
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+    # O bootstrap do deploy (preDeployCommand / release:) roda em outro
+    # container: um SQLite no disco deste não tem schema nem seed. Aqui é
+    # idempotente e usa o mesmo lock; no PostgreSQL fica só no deploy.
+    from app import app, bootstrap, db
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            bootstrap()
+
+
+def child_exit(server, worker):
+    # Contadores do worker encerrado continuam somando; gauges "ao vivo"
+    # (requisições em andamento, pool) saem da conta
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def when_ready(server):
+    server.log.info(
+        '%d workers gthread x %d threads (CPUs: %d, memória: %d MB)', workers, threads, cpus, memory_mb
+    )
+
+
+def post_fork(server, worker):
+    # Com preload_app o app foi importado no master: cada worker descarta o
+    # pool de conexões herdado e abre as suas
+    from app import app, db
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    # Última publicação dos contadores do worker (caches, pool) antes de ele
+    # sair, por max_requests ou no deploy
+    from app import export_stats_in_context
+    export_stats_in_context()""")
 
     # app.py (backend principal)
-    create_file(f"{base}/backend/app.py", """from flask import Flask, jsonify, request
+    create_file(f"{base}/backend/app.py", """from flask import Flask, jsonify, request, make_response, g, has_request_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from flask_sqlalchemy.session import Session
+from sqlalchemy import and_, or_, create_engine, event
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import validates
+from sqlalchemy.pool import QueuePool
+from prometheus_client import Counter, Gauge
+from flask_jwt_extended import (
+    JWTManager, create_access_token, create_refresh_token, decode_token, jwt_required,
+    get_jwt, get_jwt_identity, get_current_user, verify_jwt_in_request
+)
+from werkzeug.datastructures import MultiDict
+from werkzeug.middleware.proxy_fix import ProxyFix
+import click
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+import base64
+import json
+import math
 import os
+import sys
+import tempfile
+import threading
+import time
+
+from cache import VersionedCache
+from compression import available_encodings, compress
+from dbpool import TimedQueuePool, pool_stats
+from metrics import StatsCounter, export_periodically, instrument_requests, render_metrics
+from migrations import migrate, migration_lock
+from passwords import PasswordHasher, PasswordPoolBusy
+from profiler import ProfilerMiddleware, Sampler, sampling_rate
+from ratelimit import TokenBucketLimiter, parse_rate
+from replica import Replica
+from revocation import RevocationList
+from search import search_index_for
+from seed import SEED_ADMIN, SEED_CATEGORIES, SEED_PRODUCTS, synthetic_products
+from serializers import ProductSerializer, dumps, encode_array, encode_object
+from sqlite_profile import apply_pragmas, read_only_url, sqlite_pragmas
+from timing import (
+    assert_max_queries, capture_queries, instrument_queries, instrument_timings, time_views, timed
+)
 
 app = Flask(__name__)
 
@@ -225,26 +481,239 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'jessica-santana-secret-2025')
 app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jessica-santana-jwt-2025')
 
+# Access token curto, renovado pelo refresh token; revogações (logout, "revogar
+# sessões") ficam em memória em cada worker e são lidas do banco a cada intervalo
+app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=int(os.environ.get('ACCESS_TOKEN_MINUTES', 15)))
+app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=int(os.environ.get('REFRESH_TOKEN_DAYS', 30)))
+app.config['REVOCATION_SYNC_INTERVAL'] = float(os.environ.get('REVOCATION_SYNC_INTERVAL', 1))
+
 # Configuração do banco de dados
+def database_uri(url):
+    # Driver explícito (psycopg 3): as opções de conexão abaixo são as da libpq
+    for prefix in ('postgres://', 'postgresql://'):
+        if url.startswith(prefix):
+            return url.replace(prefix, 'postgresql+psycopg://', 1)
+    return url
+
 database_url = os.environ.get('DATABASE_URL')
 if database_url:
     # Para produção (PostgreSQL)
-    if database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(database_url)
 else:
     # Para desenvolvimento (SQLite)
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///loja.db'
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Pool de conexões (por worker): pool_size + max_overflow deve cobrir as
+# threads do worker (GUNICORN_THREADS)
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+app.config['DB_POOL_PRE_PING'] = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+app.config['DB_CONNECT_TIMEOUT'] = int(os.environ.get('DB_CONNECT_TIMEOUT', 5))
+app.config['DB_STATEMENT_TIMEOUT_MS'] = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 15000))
+
+def engine_options_for(uri, poolclass=TimedQueuePool):
+    engine_options = {
+        'poolclass': poolclass,
+        'pool_size': app.config['DB_POOL_SIZE'],
+        'max_overflow': app.config['DB_MAX_OVERFLOW'],
+        'pool_timeout': app.config['DB_POOL_TIMEOUT']
+    }
+    if uri.startswith('postgresql'):
+        engine_options.update({
+            # Depois de um restart do PostgreSQL as conexões do pool estão mortas:
+            # o pre-ping as descarta no checkout em vez de falhar a requisição
+            'pool_pre_ping': app.config['DB_POOL_PRE_PING'],
+            'pool_recycle': app.config['DB_POOL_RECYCLE'],
+            'connect_args': {
+                'connect_timeout': app.config['DB_CONNECT_TIMEOUT'],
+                'options': '-c statement_timeout=%d' % app.config['DB_STATEMENT_TIMEOUT_MS']
+            }
+        })
+    return engine_options
+
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_for(app.config['SQLALCHEMY_DATABASE_URI'])
+
+# Réplica de leitura (opcional): os GETs do catálogo vão para ela enquanto
+# responder com atraso de até REPLICA_MAX_LAG segundos; fora disso, primário
+replica_url = os.environ.get('DATABASE_REPLICA_URL')
+app.config['DATABASE_REPLICA_URI'] = database_uri(replica_url) if replica_url else None
+app.config['REPLICA_MAX_LAG'] = float(os.environ.get('REPLICA_MAX_LAG', 5))
+app.config['REPLICA_CHECK_INTERVAL'] = float(os.environ.get('REPLICA_CHECK_INTERVAL', 5))
+
+# SQLite (sem DATABASE_URL): perfil para vários workers e threads no mesmo
+# arquivo; SQLITE_READONLY_GETS abre as leituras dos GETs em modo somente leitura
+app.config['SQLITE_JOURNAL_MODE'] = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'normal')
+app.config['SQLITE_BUSY_TIMEOUT_MS'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+app.config['SQLITE_MMAP_SIZE'] = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+app.config['SQLITE_CACHE_SIZE'] = int(os.environ.get('SQLITE_CACHE_SIZE', -20000))
+app.config['SQLITE_READONLY_GETS'] = os.environ.get('SQLITE_READONLY_GETS', '0') == '1'
+
+# Hash de senhas: algoritmo/parâmetros por ambiente e pool de processos limitado
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 1))
+app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 4))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+
+# Limite de tentativas em login/cadastro ("tentativas/segundos"), compartilhado
+# entre os workers por um arquivo SQLite local
+app.config['AUTH_RATE_LIMIT_ENABLED'] = os.environ.get('AUTH_RATE_LIMIT_ENABLED', '1') == '1'
+app.config['AUTH_RATE_LIMIT_PER_IP'] = os.environ.get('AUTH_RATE_LIMIT_PER_IP', '20/60')
+app.config['AUTH_RATE_LIMIT_PER_EMAIL'] = os.environ.get('AUTH_RATE_LIMIT_PER_EMAIL', '5/60')
+app.config['AUTH_RATE_LIMIT_DB'] = os.environ.get(
+    'AUTH_RATE_LIMIT_DB', os.path.join(tempfile.gettempdir(), 'loja-ratelimit.db')
+)
+
+# Railway entrega as requisições por um proxy: o IP do cliente vem em X-Forwarded-For
+app.config['PROXY_FIX_X_FOR'] = int(os.environ.get('PROXY_FIX_X_FOR', 1))
+
+# Paginação do catálogo
+app.config['PRODUCTS_PAGE_SIZE'] = int(os.environ.get('PRODUCTS_PAGE_SIZE', 24))
+app.config['PRODUCTS_MAX_PAGE_SIZE'] = int(os.environ.get('PRODUCTS_MAX_PAGE_SIZE', 100))
+
+# Cache do catálogo (por worker do gunicorn)
+app.config['CATALOG_CACHE_SIZE'] = int(os.environ.get('CATALOG_CACHE_SIZE', 512))
+app.config['CATALOG_CACHE_TTL'] = float(os.environ.get('CATALOG_CACHE_TTL', 300))
+app.config['CATALOG_VERSION_TTL'] = float(os.environ.get('CATALOG_VERSION_TTL', 1))
+
+# Cache dos usuários autenticados (por worker)
+app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))
+app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 60))
+
+# Cache HTTP (navegadores e edge do Netlify)
+app.config['CATALOG_MAX_AGE'] = int(os.environ.get('CATALOG_MAX_AGE', 60))
+app.config['CATALOG_STALE_WHILE_REVALIDATE'] = int(os.environ.get('CATALOG_STALE_WHILE_REVALIDATE', 300))
+
+# Modo assíncrono (asgi.py): pool do driver async (aiosqlite/asyncpg) por worker
+app.config['ASYNC_DB_POOL_SIZE'] = int(os.environ.get('ASYNC_DB_POOL_SIZE', 10))
+app.config['ASYNC_DB_MAX_OVERFLOW'] = int(os.environ.get('ASYNC_DB_MAX_OVERFLOW', 20))
+
+# Prontidão (/api/health/ready) e métricas (/metrics); com METRICS_TOKEN o
+# /metrics exige "Authorization: Bearer <token>"
+app.config['READY_CHECK_TTL'] = float(os.environ.get('READY_CHECK_TTL', 2))
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['METRICS_SYNC_INTERVAL'] = float(os.environ.get('METRICS_SYNC_INTERVAL', 1))
+
+# Instrumentação por requisição: cabeçalho Server-Timing, uma linha JSON por
+# requisição no stdout e log das consultas acima de SLOW_QUERY_MS
+app.config['SERVER_TIMING'] = os.environ.get('SERVER_TIMING', '1') == '1'
+app.config['REQUEST_LOG'] = os.environ.get('REQUEST_LOG', '1') == '1'
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 200))
+
+# Perfil por amostragem sob demanda (só administradores): cabeçalho X-Profile
+# em uma requisição ou POST /api/admin/profile para uma janela de tempo
+app.config['PROFILER_ENABLED'] = os.environ.get('PROFILER_ENABLED', '1') == '1'
+app.config['PROFILER_RATE'] = float(os.environ.get('PROFILER_RATE', 100))
+app.config['PROFILER_MAX_RATE'] = float(os.environ.get('PROFILER_MAX_RATE', 1000))
+app.config['PROFILER_MAX_SECONDS'] = float(os.environ.get('PROFILER_MAX_SECONDS', 60))
+
+# Compressão das respostas (gzip/brotli)
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+app.config['COMPRESS_GZIP_LEVEL'] = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+app.config['COMPRESS_BROTLI_QUALITY'] = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+
+if app.config['PROXY_FIX_X_FOR']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+class RoutingSession(Session):
+    # Em GET/HEAD as consultas podem ir para o engine de leitura (read_engine:
+    # réplica ou SQLite somente leitura); flush e escritas usam sempre o primário
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and read_only_request():
+            engine = read_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 # Inicializar extensões
-db = SQLAlchemy(app)
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
 jwt = JWTManager(app)
 CORS(app, origins=['*'])
+password_hasher = PasswordHasher(
+    app.config['PASSWORD_HASH_METHOD'],
+    workers=app.config['PASSWORD_HASH_WORKERS'],
+    queue_size=app.config['PASSWORD_HASH_QUEUE'],
+    timeout=app.config['PASSWORD_HASH_TIMEOUT']
+)
+auth_limiter = TokenBucketLimiter(app.config['AUTH_RATE_LIMIT_DB'])
+revocations = RevocationList(app.config['REVOCATION_SYNC_INTERVAL'])
+# Antes de qualquer outro hook: mede a requisição inteira
+instrument_requests(app)
+instrument_timings(app, app.config['SERVER_TIMING'], app.config['REQUEST_LOG'])
+instrument_queries(app.config['SLOW_QUERY_MS'])
+
+# ============ SQLITE ============
+
+SQLITE_PRAGMAS = sqlite_pragmas(app.config)
+
+with app.app_context():
+    if db.engine.dialect.name == 'sqlite':
+        apply_pragmas(db.engine, SQLITE_PRAGMAS)
+
+def read_only_request():
+    return has_request_context() and request.method in ('GET', 'HEAD')
+
+_read_engine = {'engine': None}
+_read_engine_lock = threading.Lock()
+
+def sqlite_read_engine():
+    # Mesmo arquivo aberto com mode=ro: uma leitura nunca disputa o lock de escrita
+    if not app.config['SQLITE_READONLY_GETS'] or db.engine.dialect.name != 'sqlite':
+        return None
+    engine = _read_engine['engine']
+    if engine is None:
+        with _read_engine_lock:
+            if _read_engine['engine'] is None:
+                engine = create_engine(read_only_url(db.engine.url), **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+                apply_pragmas(engine, SQLITE_PRAGMAS, read_only=True)
+                _read_engine['engine'] = engine
+            engine = _read_engine['engine']
+    return engine
+
+# ============ RÉPLICA DE LEITURA ============
+
+# Só leituras públicas do catálogo: fluxos que leem a própria escrita
+# (cadastro -> token -> perfil, pedidos, admin) ficam no primário
+REPLICA_ENDPOINTS = {'get_products', 'get_product', 'get_categories', 'search_products'}
+
+def create_replica_engine():
+    uri = app.config['DATABASE_REPLICA_URI']
+    # QueuePool comum: pool_stats mede só o pool do primário
+    engine = create_engine(uri, **engine_options_for(uri, poolclass=QueuePool))
+    if engine.dialect.name == 'sqlite':
+        apply_pragmas(engine, SQLITE_PRAGMAS, read_only=True)
+    return engine
+
+replica = None
+if app.config['DATABASE_REPLICA_URI']:
+    replica = Replica(create_replica_engine, app.config['REPLICA_MAX_LAG'], app.config['REPLICA_CHECK_INTERVAL'])
+
+def read_engine():
+    # Escolhido uma vez por requisição: versão do catálogo e dados vêm do
+    # mesmo banco mesmo que a réplica caia no meio
+    if 'read_engine' not in g:
+        engine = None
+        if replica is not None and request.endpoint in REPLICA_ENDPOINTS and replica.available():
+            engine = replica.engine
+        g.read_source = 'replica' if engine is not None else 'primary'
+        g.read_engine = engine or sqlite_read_engine()
+    return g.read_engine
+
+def read_source():
+    if read_only_request():
+        read_engine()
+        return g.read_source
+    return 'primary'
 
 # ============ MODELOS ============
 
+def normalize_email(email):
+    return str(email or '').strip().lower()
+
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -253,11 +722,21 @@ class User(db.Model):
     is_admin = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Garante no banco que "Ana@x.com" e "ana@x.com" são o mesmo email,
+        # e é o índice usado pelo login
+        db.Index('ix_user_email_normalized', db.func.lower(email), unique=True),
+    )
+    
+    @validates('email')
+    def validate_email(self, key, email):
+        return normalize_email(email)
+    
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
     
     def to_dict(self):
         return {
@@ -271,55 +750,805 @@ class User(db.Model):
 class Category(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    slug = db.Column(db.String(100), nullable=False)
+    slug = db.Column(db.String(100), unique=True, index=True, nullable=False)
     description = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def to_dict(self):
         return {
             'id': self.id,
             'name': self.name,
             'slug': self.slug,
-            'description': self.description
+            'description': self.description,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 class Product(db.Model):
+    # Campos que podem ser pedidos em ?fields= (category é o dicionário da categoria)
+    FIELDS = (
+        'id', 'name', 'description', 'price', 'original_price', 'category_id', 'category',
+        'stock', 'image_url', 'is_featured', 'is_active', 'created_at', 'updated_at'
+    )
+    # Na listagem a descrição (texto longo) só vem se for pedida explicitamente
+    LISTING_FIELDS = tuple(f for f in FIELDS if f != 'description')
+    
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
     original_price = db.Column(db.Float)
-    category_id = db.Column(db.Integer, db.ForeignKey('category.id'))
+    category_id = db.Column(db.Integer, db.ForeignKey('category.id'), index=True)
     stock = db.Column(db.Integer, default=0)
     image_url = db.Column(db.String(500))
     is_featured = db.Column(db.Boolean, default=False)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     category = db.relationship('Category', backref='products')
     
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'price': self.price,
-            'original_price': self.original_price,
-            'category_id': self.category_id,
-            'category': self.category.to_dict() if self.category else None,
-            'stock': self.stock,
-            'image_url': self.image_url,
-            'is_featured': self.is_featured,
-            'is_active': self.is_active,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+    __table_args__ = (
+        # Um índice por formato de filtro + ordenação usado em get_products,
+        # sempre terminando em id para servir a paginação keyset
+        db.Index('ix_product_active_created_id', 'is_active', 'created_at', 'id'),
+        db.Index('ix_product_active_category_created', 'is_active', 'category_id', 'created_at', 'id'),
+        db.Index('ix_product_active_featured_created', 'is_active', 'is_featured', 'created_at', 'id'),
+        db.Index('ix_product_active_price', 'is_active', 'price', 'id'),
+        db.Index('ix_product_active_category_price', 'is_active', 'category_id', 'price', 'id'),
+        db.Index('ix_product_active_name', 'is_active', 'name', 'id'),
+        db.Index('ix_product_active_category_name', 'is_active', 'category_id', 'name', 'id'),
+    )
+    
+    def to_dict(self, fields=FIELDS):
+        # Só toca nos atributos pedidos, para não disparar carga de colunas adiadas
+        data = {}
+        for field in fields:
+            value = getattr(self, field)
+            if field == 'category':
+                value = value.to_dict() if value else None
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            data[field] = value
+        return data
+
+class TokenRevocation(db.Model):
+    # Uma linha por revogação: um token (jti) no logout, ou um corte por
+    # usuário (user_id) / global (ambos nulos) que invalida todo token emitido
+    # até issued_before. Datas em epoch, como os claims do JWT; a linha pode
+    # ser apagada depois de expires, quando os tokens afetados já expiraram.
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36))
+    user_id = db.Column(db.Integer)
+    issued_before = db.Column(db.Integer)
+    expires = db.Column(db.Integer, nullable=False, index=True)
+    revoked_at = db.Column(db.Integer, nullable=False)
+    
+    def as_row(self):
+        return (self.id, self.jti, self.user_id, self.issued_before, self.expires)
+
+class CatalogVersion(db.Model):
+    # Linha única incrementada a cada escrita em Product/Category; é o que
+    # permite a todos os workers invalidarem o cache local do catálogo
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# ============ USUÁRIO AUTENTICADO ============
+
+# Versão fixa: usuários são invalidados um a um (delete) e pelo TTL
+USER_CACHE_VERSION = 0
+user_cache = VersionedCache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+
+@jwt.user_lookup_loader
+def load_current_user(jwt_header, jwt_data):
+    # get_current_user() devolve o User.to_dict() em cache: rotas que só precisam do id
+    # e de is_admin não tocam no banco
+    identity = jwt_data['sub']
+    user = user_cache.get(identity, USER_CACHE_VERSION)
+    if user is None:
+        user = db.session.get(User, int(identity))
+        if user is None:
+            return None
+        user = user.to_dict()
+        user_cache.set(identity, USER_CACHE_VERSION, user)
+    return user
+
+@event.listens_for(db.session, 'after_flush')
+def track_user_changes(session, flush_context):
+    changed = [obj for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)]
+    if changed:
+        session.info.setdefault('users_changed', set()).update(str(u.id) for u in changed)
+
+@event.listens_for(db.session, 'after_commit')
+def invalidate_user_cache(session):
+    # Os outros workers enxergam a mudança quando o TTL expira
+    for identity in session.info.pop('users_changed', ()):
+        user_cache.delete(identity)
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_user_changes(session):
+    session.info.pop('users_changed', None)
+
+# ============ SESSÕES E REVOGAÇÃO ============
+
+# Linhas criadas há menos que isso são relidas a cada sync: no PostgreSQL um
+# id menor pode ficar visível depois de um maior (transações concorrentes)
+REVOCATION_RESYNC_WINDOW = 30
+
+def sync_revocations():
+    now = int(time.time())
+    rows = db.session.query(
+        TokenRevocation.id, TokenRevocation.jti, TokenRevocation.user_id,
+        TokenRevocation.issued_before, TokenRevocation.expires
+    ).filter(
+        or_(TokenRevocation.id > revocations.last_id,
+            TokenRevocation.revoked_at >= now - REVOCATION_RESYNC_WINDOW),
+        TokenRevocation.expires > now
+    ).all()
+    revocations.load(rows, now)
+
+@jwt.token_in_blocklist_loader
+def token_revoked(jwt_header, jwt_payload):
+    # Checado em toda rota protegida: só consulta o banco quando o intervalo
+    # de sync venceu, o resto é lookup em dict
+    if revocations.due():
+        try:
+            sync_revocations()
+        except Exception as e:
+            # Sem banco segue com o que já está em memória
+            app.logger.warning('Falha ao sincronizar revogações: %s', e)
+    return revocations.is_revoked(jwt_payload['jti'], jwt_payload['sub'], jwt_payload['iat'])
+
+def issue_tokens(user_id):
+    identity = str(user_id)
+    return {
+        'access_token': create_access_token(identity=identity),
+        'refresh_token': create_refresh_token(identity=identity)
+    }
+
+def revoke(entries):
+    # entries: [(jti, user_id, issued_before, expires)], gravadas em um único commit
+    now = int(time.time())
+    records = [
+        TokenRevocation(jti=jti, user_id=user_id, issued_before=issued_before,
+                        expires=expires, revoked_at=now)
+        for jti, user_id, issued_before, expires in entries
+    ]
+    db.session.add_all(records)
+    # Aproveita a escrita para limpar o que já expirou
+    TokenRevocation.query.filter(TokenRevocation.expires <= now).delete(synchronize_session=False)
+    db.session.flush()
+    rows = [r.as_row() for r in records]
+    db.session.commit()
+    # Vale na hora neste worker; os outros veem no próximo sync
+    revocations.load(rows, now)
+
+def admin_required(view):
+    @wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not get_current_user()['is_admin']:
+            return jsonify({'message': 'Acesso restrito a administradores'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def stats_access_required(view):
+    # Rotas de diagnóstico: o mesmo token do /metrics (para quem coleta) ou um
+    # administrador; sem METRICS_TOKEN definido, só administradores
+    admin_view = admin_required(view)
+    
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') == 'Bearer ' + token:
+            return view(*args, **kwargs)
+        return admin_view(*args, **kwargs)
+    return wrapper
+
+# ============ VERSÃO E CACHE DO CATÁLOGO ============
+
+catalog_cache = VersionedCache(app.config['CATALOG_CACHE_SIZE'], app.config['CATALOG_CACHE_TTL'])
+_catalog_version = {'value': None, 'updated_at': None, 'checked_at': 0.0, 'source': None}
+_catalog_version_lock = threading.Lock()
+
+@event.listens_for(db.session, 'after_flush')
+def bump_catalog_version(session, flush_context):
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, (Product, Category)) for obj in changed):
+        # Mesma transação da escrita: a versão só muda se a escrita for confirmada
+        session.connection().execute(
+            db.update(CatalogVersion).values(
+                version=CatalogVersion.version + 1,
+                updated_at=datetime.utcnow()
+            )
+        )
+        session.info['catalog_changed'] = True
+
+@event.listens_for(db.session, 'after_commit')
+def expire_catalog_version(session):
+    if session.info.pop('catalog_changed', False):
+        # Este worker enxerga a própria escrita imediatamente
+        with _catalog_version_lock:
+            _catalog_version['checked_at'] = 0.0
+
+@event.listens_for(db.session, 'after_rollback')
+def discard_catalog_change(session):
+    session.info.pop('catalog_changed', None)
+
+CATALOG_VERSION_QUERY = db.select(CatalogVersion.version, CatalogVersion.updated_at)
+
+def cached_catalog_version(source='primary'):
+    # None quando o TTL venceu e a versão precisa ser relida do banco. A versão
+    # lida na réplica só vale para leituras da réplica (e a do primário, só
+    # para o primário): senão dados atrasados ficariam no cache com a versão nova
+    with _catalog_version_lock:
+        if (_catalog_version['source'] == source
+                and time.monotonic() - _catalog_version['checked_at'] < app.config['CATALOG_VERSION_TTL']):
+            return dict(_catalog_version)
+    return None
+
+def store_catalog_version(row, checked_at, source='primary'):
+    with _catalog_version_lock:
+        _catalog_version['value'] = row.version if row else 0
+        _catalog_version['updated_at'] = row.updated_at if row else None
+        _catalog_version['checked_at'] = checked_at
+        _catalog_version['source'] = source
+        return dict(_catalog_version)
+
+def refresh_catalog_version():
+    source = read_source()
+    state = cached_catalog_version(source)
+    if state is None:
+        now = time.monotonic()
+        state = store_catalog_version(db.session.execute(CATALOG_VERSION_QUERY).first(), now, source)
+    return state
+
+def current_catalog_version():
+    return refresh_catalog_version()['value']
+
+def catalog_headers(response, etag, last_modified):
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'public, max-age=%d, stale-while-revalidate=%d' % (
+        app.config['CATALOG_MAX_AGE'], app.config['CATALOG_STALE_WHILE_REVALIDATE']
+    )
+    response.vary.add('Accept-Encoding')
+    return response
+
+def not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+def catalog_not_modified(etag, last_modified):
+    return catalog_headers(app.response_class(status=304), etag, last_modified)
+
+def catalog_lookup(state):
+    # Devolve (resposta, entrada): a resposta é o 304 ou o HIT do cache, ou
+    # None quando a view precisa rodar; a entrada vai para catalog_store()
+    version = state['value']
+    last_modified = state['updated_at']
+    if last_modified:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    
+    # O mesmo URL só muda de conteúdo quando a versão do catálogo muda
+    etag = 'catalog-%s' % version
+    
+    # Chave normalizada: ordem dos parâmetros e valores vazios não importam
+    params = tuple(sorted((k, v) for k, v in request.args.items(multi=True) if v))
+    key = (request.path, params)
+    entry = (key, version, etag, last_modified)
+    
+    # Só há 304 para uma URL que já respondeu 200 (no cache ou em
+    # catalog_store): parâmetros inválidos passam pela view e recebem o 400
+    body = catalog_cache.get(key, version)
+    if body is not None:
+        if not_modified(etag, last_modified):
+            return catalog_not_modified(etag, last_modified), entry
+        g.catalog_cache_entry = (key, version)
+        response = app.response_class(body, mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT'
+        return catalog_headers(response, etag, last_modified), entry
+    return None, entry
+
+def catalog_store(response, entry):
+    if response.status_code != 200:
+        return response
+    
+    key, version, etag, last_modified = entry
+    catalog_cache.set(key, version, response.get_data())
+    if not_modified(etag, last_modified):
+        return catalog_not_modified(etag, last_modified)
+    g.catalog_cache_entry = (key, version)
+    response.headers['X-Cache'] = 'MISS'
+    return catalog_headers(response, etag, last_modified)
+
+def catalog_cached(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response, entry = catalog_lookup(refresh_catalog_version())
+        if response is None:
+            response = catalog_store(make_response(view(*args, **kwargs)), entry)
+        return response
+    return wrapper
+
+# ============ COMPRESSÃO ============
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if not encoding or len(body) < app.config['COMPRESS_MIN_SIZE']:
+        return response
+    
+    # Respostas do catálogo guardam os bytes comprimidos no mesmo cache
+    # (e na mesma versão) do corpo original, uma entrada por codificação
+    entry = g.get('catalog_cache_entry')
+    compressed = None
+    if entry:
+        key, version = entry
+        compressed = catalog_cache.get(key + (encoding,), version)
+    
+    if compressed is None:
+        with timed('compress'):
+            compressed = compress(
+                body, encoding,
+                gzip_level=app.config['COMPRESS_GZIP_LEVEL'],
+                brotli_quality=app.config['COMPRESS_BROTLI_QUALITY']
+            )
+        if entry:
+            catalog_cache.set(key + (encoding,), version, compressed)
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+# ============ CONSULTAS DO CATÁLOGO ============
+
+def catalog_query(fields=Product.FIELDS, order=()):
+    # Consulta de tuplas, sem instâncias do ORM: só as colunas dos campos
+    # pedidos (mais as da ordenação, usadas no cursor) saem do banco. A
+    # categoria vem do mapa de fragmentos pré-serializados, não de um JOIN.
+    columns = {f for f in fields if f != 'category'} | {c.key for c, _ in order}
+    if 'category' in fields:
+        columns.add('category_id')
+    return db.session.query(*[getattr(Product, c) for c in sorted(columns)])
+
+_category_fragments = {'version': None, 'fragments': {}}
+_category_fragments_lock = threading.Lock()
+
+def cached_category_fragments(version):
+    with _category_fragments_lock:
+        if _category_fragments['version'] == version:
+            return _category_fragments['fragments']
+    return None
+
+def store_category_fragments(version, categories):
+    fragments = {c.id: dumps(c.to_dict()) for c in categories}
+    with _category_fragments_lock:
+        _category_fragments['version'] = version
+        _category_fragments['fragments'] = fragments
+    return fragments
+
+def category_fragments():
+    # JSON de cada categoria serializado uma vez por versão do catálogo
+    version = current_catalog_version()
+    fragments = cached_category_fragments(version)
+    if fragments is None:
+        fragments = store_category_fragments(version, Category.query.all())
+    return fragments
+
+def product_serializer(fields):
+    return ProductSerializer(fields, category_fragments() if 'category' in fields else {})
+
+def json_body(body, status=200):
+    return app.response_class(body, status=status, mimetype='application/json')
+
+class InvalidFields(ValueError):
+    pass
+
+class InvalidParameter(ValueError):
+    pass
+
+def requested_fields(default):
+    fields = request.args.get('fields')
+    if not fields:
+        return default
+    
+    fields = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in Product.FIELDS]
+    if unknown:
+        raise InvalidFields(', '.join(unknown))
+    # id sempre acompanha a projeção (chaves do frontend e links)
+    return tuple(['id'] + [f for f in fields if f != 'id'])
+
+# Ordenações da listagem: (coluna, decrescente). O id desempata e torna a ordem total.
+PRODUCT_SORTS = {
+    'newest': [(Product.created_at, True), (Product.id, True)],
+    'price_asc': [(Product.price, False), (Product.id, False)],
+    'price_desc': [(Product.price, True), (Product.id, True)],
+    'name': [(Product.name, False), (Product.id, False)],
+}
+DEFAULT_PRODUCT_SORT = 'newest'
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(values):
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def cursor_value(column, value):
+    # O cursor vem do cliente: cada valor precisa ter o tipo da sua coluna
+    # antes de entrar no WHERE (no PostgreSQL, tipo errado é DataError e 500)
+    if isinstance(column.type, db.DateTime):
+        if not isinstance(value, str):
+            raise InvalidCursor(value)
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, db.Integer):
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    elif isinstance(column.type, db.Float):
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    elif isinstance(column.type, db.String):
+        valid = isinstance(value, str)
+    else:
+        valid = False
+    if not valid:
+        raise InvalidCursor(value)
+    return value
+
+def decode_cursor(cursor, order):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(order):
+            raise InvalidCursor(cursor)
+        return [cursor_value(column, v) for (column, _), v in zip(order, values)]
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+def keyset_filter(order, values):
+    # (a, b) < (x, y)  ==>  a < x OR (a = x AND b < y), respeitando a direção de cada coluna
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        prefix = [c == v for (c, _), v in zip(order[:i], values[:i])]
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+def order_products(query, order):
+    return query.order_by(*[c.desc() if d else c.asc() for c, d in order])
+
+def keyset_page(query, order, limit, cursor=None):
+    if cursor:
+        query = query.filter(keyset_filter(order, decode_cursor(cursor, order)))
+    # Busca um item a mais só para saber se existe próxima página
+    return order_products(query, order).limit(limit + 1)
+
+def keyset_result(rows, order, limit):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c, _ in order])
+    return rows, next_cursor, has_more
+
+BOOLEAN_ARGS = {'1': True, 'true': True, '0': False, 'false': False}
+
+def boolean_arg(args, name):
+    # Ausente ou vazio é falso; fora de 1/true/0/false é 400, não "verdadeiro"
+    value = args.get(name)
+    if not value:
+        return False
+    if value.lower() not in BOOLEAN_ARGS:
+        raise InvalidParameter(name)
+    return BOOLEAN_ARGS[value.lower()]
+
+def number_arg(args, name, type=float):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        number = type(value)
+    except ValueError:
+        raise InvalidParameter(name)
+    if not math.isfinite(number):
+        raise InvalidParameter(name)
+    return number
+
+def filter_products(query, args, order=()):
+    category_id = number_arg(args, 'category_id', int)
+    category_slug = args.get('category')
+    min_price = number_arg(args, 'min_price')
+    max_price = number_arg(args, 'max_price')
+    
+    # Faixa de preço com ordenação que não é por preço: price + 0 impede o
+    # banco de usar o índice de preço para a faixa (e ordenar o resultado
+    # inteiro); percorre o índice da ordenação e para na página
+    price = Product.price
+    if order and order[0][0] is not Product.price:
+        price = Product.price + 0
+    
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    
+    if category_slug:
+        # Subconsulta escalar: resolve o slug pelo índice único e filtra pelo índice de category_id
+        category = db.select(Category.id).where(Category.slug == category_slug).scalar_subquery()
+        query = query.filter(Product.category_id == category)
+    
+    if boolean_arg(args, 'featured'):
+        query = query.filter(Product.is_featured == db.true())
+    
+    if boolean_arg(args, 'in_stock'):
+        query = query.filter(Product.stock > 0)
+    
+    if min_price is not None:
+        query = query.filter(price >= min_price)
+    
+    if max_price is not None:
+        query = query.filter(price <= max_price)
+    
+    return query
+
+def page_limit():
+    limit = request.args.get('limit', app.config['PRODUCTS_PAGE_SIZE'], type=int)
+    if limit < 1:
+        return None
+    return min(limit, app.config['PRODUCTS_MAX_PAGE_SIZE'])
+
+def products_listing():
+    # Monta (sem executar) a consulta de uma página da listagem a partir de
+    # request.args; a rota síncrona e a assíncrona (asgi.py) usam a mesma
+    sort = request.args.get('sort', DEFAULT_PRODUCT_SORT)
+    limit = page_limit()
+    
+    if limit is None:
+        raise InvalidParameter('limit')
+    
+    if sort not in PRODUCT_SORTS:
+        raise InvalidParameter('sort')
+    
+    fields = requested_fields(Product.LISTING_FIELDS)
+    order = PRODUCT_SORTS[sort]
+    query = catalog_query(fields, order).filter(Product.is_active == db.true())
+    query = filter_products(query, request.args, order)
+    query = keyset_page(query, order, limit, request.args.get('cursor'))
+    return query, fields, order, limit
+
+def products_listing_body(rows, fields, order, limit, serializer):
+    rows, next_cursor, has_more = keyset_result(rows, order, limit)
+    with timed('serialize'):
+        body = encode_object([
+            ('has_more', dumps(has_more)),
+            ('next_cursor', dumps(next_cursor)),
+            ('products', encode_array(serializer.encode(row) for row in rows))
+        ])
+    return json_body(body)
+
+# ============ BUSCA ============
+
+SEARCH_BATCH_SIZE = 1000
+
+def reindex_products(connection, product_ids):
+    product_ids = list(product_ids)
+    index = search_index_for(connection.dialect.name)
+    for start in range(0, len(product_ids), SEARCH_BATCH_SIZE):
+        batch = product_ids[start:start + SEARCH_BATCH_SIZE]
+        rows = connection.execute(
+            db.select(Product.id, Product.name, Product.description, Category.name)
+            .outerjoin(Category, Category.id == Product.category_id)
+            .where(Product.id.in_(batch))
+        ).all()
+        index.replace(connection, rows)
+        index.delete(connection, set(batch) - {row[0] for row in rows})
+
+@event.listens_for(db.session, 'after_flush')
+def update_search_index(session, flush_context):
+    # O índice de busca acompanha cada escrita na mesma transação
+    product_ids = set()
+    category_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Product):
+            product_ids.add(obj.id)
+        elif isinstance(obj, Category) and obj not in session.new:
+            category_ids.add(obj.id)
+    
+    connection = session.connection()
+    if category_ids:
+        # O nome da categoria faz parte do documento de cada produto dela
+        product_ids.update(connection.execute(
+            db.select(Product.id).where(Product.category_id.in_(category_ids))
+        ).scalars())
+    if product_ids:
+        reindex_products(connection, product_ids)
+
+def rebuild_search_index():
+    connection = db.session.connection()
+    search_index_for(connection.dialect.name).create(connection)
+    reindex_products(connection, connection.execute(db.select(Product.id)).scalars().all())
+    db.session.commit()
+
+@app.cli.command('reindex-search')
+def reindex_search_command():
+    rebuild_search_index()
+    print('✅ Índice de busca reconstruído!')
+
+# ============ MIGRAÇÕES E PLANOS DE CONSULTA ============
+
+@app.cli.command('migrate')
+def migrate_command():
+    with app.app_context():
+        applied = migrate(db.engine, db.metadata)
+    for version, description in applied:
+        print(f'✅ Migração {version}: {description}')
+    if not applied:
+        print('✅ Banco de dados já está atualizado')
+
+def hot_queries():
+    # Os formatos de consulta de get_products/get_product mais frequentes,
+    # montados pelas mesmas funções usadas nas rotas
+    def listing(args, sort=DEFAULT_PRODUCT_SORT):
+        order = PRODUCT_SORTS[sort]
+        query = catalog_query(Product.LISTING_FIELDS, order).filter(Product.is_active == db.true())
+        query = filter_products(query, MultiDict(args), order)
+        return order_products(query, order).limit(app.config['PRODUCTS_PAGE_SIZE'] + 1)
+    
+    return {
+        'listagem': listing({}),
+        'destaques': listing({'featured': 'true'}),
+        'categoria': listing({'category': 'alfaiataria'}),
+        'categoria_por_id': listing({'category_id': '1'}),
+        'menor_preco': listing({}, 'price_asc'),
+        'maior_preco': listing({}, 'price_desc'),
+        'categoria_menor_preco': listing({'category': 'alfaiataria'}, 'price_asc'),
+        'nome': listing({}, 'name'),
+        'categoria_nome': listing({'category': 'alfaiataria'}, 'name'),
+        'destaques_nome': listing({'featured': 'true'}, 'name'),
+        'faixa_preco': listing({'min_price': '100', 'max_price': '300'}),
+        'faixa_preco_menor_preco': listing({'min_price': '100', 'max_price': '300'}, 'price_asc'),
+        'faixa_preco_nome': listing({'min_price': '100', 'max_price': '300'}, 'name'),
+        'categoria_faixa_preco': listing({'category': 'alfaiataria', 'min_price': '100', 'max_price': '300'}),
+        'em_estoque': listing({'in_stock': 'true'}),
+        'em_estoque_menor_preco': listing({'in_stock': 'true'}, 'price_asc'),
+        'produto': catalog_query().filter(Product.id == 1),
+    }
+
+def explain(query):
+    connection = db.session.connection()
+    sql = str(query.statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+    if connection.dialect.name == 'sqlite':
+        return [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+    # Com poucas linhas o PostgreSQL sempre prefere Seq Scan; desligar obriga
+    # o planejador a mostrar se existe um índice que atenda a consulta
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    return [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + sql)]
+
+def plan_regressions(plan):
+    regressions = []
+    for line in plan:
+        if line.startswith('SCAN product') and 'USING' not in line:
+            regressions.append(line)
+        elif 'Seq Scan on product' in line:
+            regressions.append(line)
+        elif 'USE TEMP B-TREE FOR ORDER BY' in line:
+            regressions.append(line)
+    return regressions
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    failed = False
+    with app.app_context():
+        for name, query in hot_queries().items():
+            plan = explain(query)
+            regressions = plan_regressions(plan)
+            failed = failed or bool(regressions)
+            print(f"{'❌' if regressions else '✅'} {name}")
+            for line in plan:
+                print(f'    {line}')
+        db.session.rollback()
+    if failed:
+        sys.exit(1)
+
+# Máximo de consultas por requisição com os caches do worker vazios (a
+# primeira depois de uma escrita no catálogo); com cache quente são 0 ou 1
+QUERY_BUDGETS = [
+    ('/api/products', 3),
+    ('/api/products?category=alfaiataria&sort=price_asc', 3),
+    ('/api/products/search?q=vestido', 4),
+    ('/api/products/1', 3),
+    ('/api/categories', 2),
+]
+
+def clear_catalog_caches():
+    catalog_cache.clear()
+    with _catalog_version_lock:
+        _catalog_version['checked_at'] = 0.0
+    with _category_fragments_lock:
+        _category_fragments['version'] = None
+
+@app.cli.command('check-query-budgets')
+def check_query_budgets_command():
+    failed = False
+    client = app.test_client()
+    for path, limit in QUERY_BUDGETS:
+        clear_catalog_caches()
+        try:
+            with assert_max_queries(limit) as statements:
+                status = client.get(path).status_code
+            over = False
+        except AssertionError:
+            over = failed = True
+        print(f"{'❌' if over or status != 200 else '✅'} {path}: {len(statements)} consultas (máximo {limit})")
+        failed = failed or status != 200
+        if over:
+            for statement in statements:
+                print(f"    {' '.join(statement.split())}")
+    if failed:
+        sys.exit(1)
 
 # ============ ROTAS ============
 
+HEALTH = {'status': 'ok', 'message': 'API Jéssica Santana funcionando!'}
+
 @app.route('/api/health')
 def health():
-    return {'status': 'ok', 'message': 'API Jéssica Santana funcionando!'}
+    return HEALTH
+
+def server_busy():
+    # Recusa rápida quando o pool de hash está cheio, em vez de enfileirar
+    # e prender o worker que também atende o catálogo
+    response = jsonify({'message': 'Servidor ocupado, tente novamente em instantes'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def auth_rate_limited(view):
+    # Decide antes de qualquer hash de senha: uma requisição recusada aqui
+    # custa uma transação no SQLite local, não um scrypt
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not app.config['AUTH_RATE_LIMIT_ENABLED']:
+            return view(*args, **kwargs)
+        
+        # Roda fora do try/except da view: um corpo JSON que não é objeto
+        # (lista, string) segue sem email e a view responde o erro em JSON
+        data = request.get_json(silent=True)
+        data = data if isinstance(data, dict) else {}
+        email = normalize_email(data.get('email'))
+        limits = [('ip:' + (request.remote_addr or ''), app.config['AUTH_RATE_LIMIT_PER_IP'])]
+        if email:
+            limits.append(('email:' + email, app.config['AUTH_RATE_LIMIT_PER_EMAIL']))
+        
+        for key, rate in limits:
+            try:
+                allowed, retry_after = auth_limiter.hit(key, *parse_rate(rate))
+            except Exception as e:
+                # Falha no arquivo de limites não pode derrubar o login
+                app.logger.warning('Limite de tentativas indisponível: %s', e)
+                break
+            if not allowed:
+                response = jsonify({'message': 'Muitas tentativas, tente novamente mais tarde'})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(math.ceil(retry_after))
+                return response
+        return view(*args, **kwargs)
+    return wrapper
 
 @app.route('/api/auth/login', methods=['POST'])
+@auth_rate_limited
 def login():
     try:
         data = request.get_json()
@@ -329,27 +1558,34 @@ def login():
         if not email or not password:
             return jsonify({'message': 'Email e senha são obrigatórios'}), 400
         
-        user = User.query.filter_by(email=email).first()
+        user = User.query.filter(db.func.lower(User.email) == normalize_email(email)).first()
         
         if user and user.check_password(password):
-            access_token = create_access_token(identity=user.id)
+            if password_hasher.needs_rehash(user.password_hash):
+                # Parâmetros do hash mudaram: atualiza enquanto temos a senha em mãos
+                user.set_password(password)
+                db.session.commit()
+            
             return jsonify({
                 'message': 'Login realizado com sucesso',
                 'user': user.to_dict(),
-                'access_token': access_token
+                **issue_tokens(user.id)
             }), 200
         
         return jsonify({'message': 'Credenciais inválidas'}), 401
+    except PasswordPoolBusy:
+        return server_busy()
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @app.route('/api/auth/register', methods=['POST'])
+@auth_rate_limited
 def register():
     try:
         data = request.get_json()
         
-        if User.query.filter_by(email=data.get('email')).first():
-            return jsonify({'message': 'Email já cadastrado'}), 400
+        if not data.get('name') or not normalize_email(data.get('email')) or not data.get('password'):
+            return jsonify({'message': 'Nome, email e senha são obrigatórios'}), 400
         
         user = User(
             name=data.get('name'),
@@ -357,148 +1593,2880 @@ def register():
         )
         user.set_password(data.get('password'))
         
+        # Um único INSERT: o índice único decide se o email já existe, sem
+        # SELECT antes (e sem corrida entre dois cadastros simultâneos)
         db.session.add(user)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'message': 'Email já cadastrado'}), 400
+        
+        # Serializa antes do commit: depois dele o objeto expira e seria relido
+        user_data = user.to_dict()
         db.session.commit()
         
-        access_token = create_access_token(identity=user.id)
         return jsonify({
             'message': 'Usuário criado com sucesso',
-            'user': user.to_dict(),
-            'access_token': access_token
+            'user': user_data,
+            **issue_tokens(user_data['id'])
         }), 201
+    except PasswordPoolBusy:
+        db.session.rollback()
+        return server_busy()
     except Exception as e:
         db.session.rollback()
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
+@app.route('/api/auth/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    return jsonify({'access_token': create_access_token(identity=get_jwt_identity())}), 200
+
+@app.route('/api/auth/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    try:
+        claims = get_jwt()
+        entries = [(claims['jti'], None, None, claims['exp'])]
+        
+        # O cliente manda o refresh token junto para que ele também deixe de valer
+        refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+        if refresh_token and refresh_token != request.headers.get('Authorization', '')[7:]:
+            try:
+                refresh_claims = decode_token(refresh_token)
+            except Exception:
+                # Inválido ou já expirado: não há o que revogar
+                refresh_claims = None
+            if refresh_claims and refresh_claims['sub'] == claims['sub']:
+                entries.append((refresh_claims['jti'], None, None, refresh_claims['exp']))
+        
+        revoke(entries)
+        return jsonify({'message': 'Sessão encerrada'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@app.route('/api/admin/sessions/revoke', methods=['POST'])
+@admin_required
+def revoke_sessions():
+    # Com user_id encerra as sessões desse usuário; sem, as de todos (inclusive
+    # a do próprio administrador)
+    try:
+        user_id = (request.get_json(silent=True) or {}).get('user_id')
+        if user_id is not None:
+            try:
+                user_id = int(user_id)
+            except (TypeError, ValueError):
+                return jsonify({'message': 'Parâmetro user_id inválido'}), 400
+        
+        now = int(time.time())
+        refresh_ttl = int(app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds())
+        revoke([(None, user_id, now, now + refresh_ttl)])
+        return jsonify({'message': 'Sessões revogadas'}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@app.route('/api/me')
+@jwt_required()
+def me():
+    return jsonify({'user': get_current_user()})
+
 @app.route('/api/products')
+@catalog_cached
 def get_products():
     try:
-        category_id = request.args.get('category_id')
-        featured = request.args.get('featured')
+        query, fields, order, limit = products_listing()
+        return products_listing_body(query.all(), fields, order, limit, product_serializer(fields))
+    except InvalidParameter as e:
+        return jsonify({'message': f'Parâmetro {e} inválido'}), 400
+    except InvalidCursor:
+        return jsonify({'message': 'Cursor inválido'}), 400
+    except InvalidFields as e:
+        return jsonify({'message': f'Campo inválido: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+@app.route('/api/products/search')
+@catalog_cached
+def search_products():
+    try:
+        q = request.args.get('q', '').strip()
+        cursor = request.args.get('cursor')
+        limit = page_limit()
+        
+        if not q:
+            return jsonify({'message': 'Parâmetro q é obrigatório'}), 400
         
-        query = Product.query.filter_by(is_active=True)
+        if limit is None:
+            return jsonify({'message': 'Parâmetro limit inválido'}), 400
         
-        if category_id:
-            query = query.filter_by(category_id=category_id)
+        # Resultados ordenados por relevância: o cursor guarda só a posição
+        offset = decode_cursor(cursor, [(Product.id, False)])[0] if cursor else 0
+        if offset < 0:
+            raise InvalidCursor(cursor)
         
-        if featured:
-            query = query.filter_by(is_featured=True)
+        fields = requested_fields(Product.LISTING_FIELDS)
+        connection = db.session.connection()
+        ids = search_index_for(connection.dialect.name).search(connection, q, limit + 1, offset)
+        has_more = len(ids) > limit
+        ids = ids[:limit]
         
-        products = query.all()
-        return jsonify({'products': [p.to_dict() for p in products]})
+        rows = {row.id: row for row in catalog_query(fields).filter(Product.id.in_(ids))}
+        serializer = product_serializer(fields)
+        with timed('serialize'):
+            body = encode_object([
+                ('has_more', dumps(has_more)),
+                ('next_cursor', dumps(encode_cursor([offset + limit]) if has_more else None)),
+                ('products', encode_array(serializer.encode(rows[i]) for i in ids if i in rows))
+            ])
+        return json_body(body)
+    except InvalidCursor:
+        return jsonify({'message': 'Cursor inválido'}), 400
+    except InvalidFields as e:
+        return jsonify({'message': f'Campo inválido: {e}'}), 400
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @app.route('/api/products/<int:id>')
+@catalog_cached
 def get_product(id):
     try:
-        product = Product.query.get_or_404(id)
-        return jsonify({'product': product.to_dict()})
+        fields = requested_fields(Product.FIELDS)
+        row = catalog_query(fields).filter(Product.id == id).first()
+        
+        if not row:
+            return jsonify({'message': 'Produto não encontrado'}), 404
+        
+        serializer = product_serializer(fields)
+        with timed('serialize'):
+            body = encode_object([('product', serializer.encode(row))])
+        return json_body(body)
+    except InvalidFields as e:
+        return jsonify({'message': f'Campo inválido: {e}'}), 400
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
 @app.route('/api/categories')
+@catalog_cached
 def get_categories():
     try:
-        categories = Category.query.all()
-        return jsonify({'categories': [c.to_dict() for c in categories]})
+        fragments = category_fragments()
+        with timed('serialize'):
+            body = encode_object([('categories', encode_array(fragments.values()))])
+        return json_body(body)
     except Exception as e:
         return jsonify({'message': f'Erro interno: {str(e)}'}), 500
 
+@app.route('/api/cache/stats')
+@stats_access_required
+def cache_stats():
+    return jsonify({'catalog': catalog_cache.stats(), 'revocations': revocations.stats()})
+
+# ============ PRONTIDÃO E MÉTRICAS ============
+
+_ready = {'ok': False, 'checked_at': None}
+_ready_lock = threading.Lock()
+
+def database_ready():
+    # Resultado reaproveitado por READY_CHECK_TTL: probes frequentes custam
+    # no máximo um SELECT 1 por intervalo em cada worker
+    with _ready_lock:
+        checked_at = _ready['checked_at']
+        if checked_at is None or time.monotonic() - checked_at >= app.config['READY_CHECK_TTL']:
+            try:
+                with db.engine.connect() as connection:
+                    connection.execute(db.select(1))
+                _ready['ok'] = True
+            except Exception as e:
+                # Rota pública: o detalhe (host, porta, usuário) fica só no log
+                app.logger.warning('Banco indisponível: %s', e)
+                _ready['ok'] = False
+            _ready['checked_at'] = time.monotonic()
+        return dict(_ready)
+
+@app.route('/api/health/ready')
+def health_ready():
+    state = database_ready()
+    body = {
+        'status': 'ready' if state['ok'] else 'unavailable',
+        'database': 'ok' if state['ok'] else 'unavailable'
+    }
+    if replica is not None:
+        # Informativo: sem réplica as leituras voltam ao primário
+        body['replica'] = 'ok' if replica.healthy else 'unavailable'
+    response = jsonify(body)
+    response.status_code = 200 if state['ok'] else 503
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+CACHE_EVENTS = StatsCounter(Counter('cache_events_total', 'Eventos dos caches locais', ['cache', 'event']))
+CACHE_ENTRIES = Gauge('cache_entries', 'Entradas nos caches locais', ['cache'], multiprocess_mode='livesum')
+DB_POOL_CHECKOUTS = StatsCounter(Counter('db_pool_checkouts_total', 'Conexões entregues pelo pool'))
+DB_POOL_TIMEOUTS = StatsCounter(Counter('db_pool_timeouts_total', 'Esperas por conexão que estouraram o timeout'))
+DB_POOL_WAIT = StatsCounter(Counter('db_pool_wait_seconds_total', 'Tempo total de espera por uma conexão'))
+DB_POOL_CONNECTIONS = Gauge('db_pool_connections', 'Conexões do pool por estado', ['state'],
+                            multiprocess_mode='livesum')
+def export_stats():
+    for name, cache in (('catalog', catalog_cache), ('users', user_cache)):
+        stats = cache.stats()
+        for kind in ('hits', 'misses', 'evictions', 'invalidations'):
+            CACHE_EVENTS.set(stats[kind], name, kind)
+        CACHE_ENTRIES.labels(name).set(stats['size'])
+    
+    pool = pool_stats.snapshot(db.engine.pool)
+    DB_POOL_CHECKOUTS.set(pool['checkouts'])
+    DB_POOL_TIMEOUTS.set(pool['timeouts'])
+    DB_POOL_WAIT.set(pool_stats.wait_total)
+    for state in ('in_use', 'idle', 'overflow'):
+        DB_POOL_CONNECTIONS.labels(state).set(pool[state])
+
+def export_stats_in_context():
+    with app.app_context():
+        export_stats()
+
+# Cada worker publica os próprios números a cada METRICS_SYNC_INTERVAL; quem
+# atende o /metrics lê os arquivos de todos
+export_periodically(export_stats_in_context, app.config['METRICS_SYNC_INTERVAL'])
+
+@app.route('/metrics')
+def prometheus_metrics():
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != 'Bearer ' + token:
+        return jsonify({'message': 'Token inválido'}), 401
+    export_stats()
+    body, content_type = render_metrics()
+    response = app.response_class(body, content_type=content_type)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/api/db/stats')
+@stats_access_required
+def db_stats():
+    # Números deste worker: cada processo do gunicorn tem o próprio pool
+    stats = {'pid': os.getpid(), 'pool': pool_stats.snapshot(db.engine.pool)}
+    if replica is not None:
+        stats['replica'] = replica.stats()
+    return jsonify(stats)
+
+# ============ PERFIL SOB DEMANDA ============
+
+profile_window_lock = threading.Lock()
+
+def profile_authorization(environ):
+    # Mesmas regras das rotas de administrador (JWT, revogação, is_admin),
+    # checadas antes de começar a amostrar
+    with app.request_context(environ):
+        try:
+            verify_jwt_in_request()
+        except Exception:
+            return make_response(jsonify({'message': 'Token inválido ou ausente'}), 401)
+        if not get_current_user()['is_admin']:
+            return make_response(jsonify({'message': 'Acesso restrito a administradores'}), 403)
+    return None
+
+if app.config['PROFILER_ENABLED']:
+    app.wsgi_app = ProfilerMiddleware(
+        app.wsgi_app, profile_authorization,
+        rate=app.config['PROFILER_RATE'], max_rate=app.config['PROFILER_MAX_RATE']
+    )
+
+@app.route('/api/admin/profile', methods=['POST'])
+@admin_required
+def profile_window():
+    # Amostra as threads ocupadas deste worker por "seconds": cada worker do
+    # gunicorn é um processo, o perfil é só do que atendeu (X-Profile-Pid)
+    if not app.config['PROFILER_ENABLED']:
+        return jsonify({'message': 'Perfil desativado (PROFILER_ENABLED=0)'}), 404
+    data = request.get_json(silent=True) or {}
+    max_seconds = app.config['PROFILER_MAX_SECONDS']
+    try:
+        seconds = float(data.get('seconds', 10))
+    except (TypeError, ValueError):
+        seconds = 0
+    if not 0 < seconds <= max_seconds:
+        return jsonify({'message': 'Parâmetro seconds deve estar entre 0 e %g' % max_seconds}), 400
+    rate = sampling_rate(data.get('rate'), app.config['PROFILER_RATE'], app.config['PROFILER_MAX_RATE'])
+    if rate is None:
+        return jsonify({'message': 'Parâmetro rate deve estar entre 0 e %g' % app.config['PROFILER_MAX_RATE']}), 400
+    
+    if not profile_window_lock.acquire(blocking=False):
+        return jsonify({'message': 'Já existe um perfil em andamento neste worker'}), 409
+    try:
+        sampler = Sampler(rate, exclude={threading.get_ident()}).start()
+        time.sleep(seconds)
+        sampler.stop()
+    finally:
+        profile_window_lock.release()
+    return sampler.response()
+
+# Depois de todas as rotas: o tempo de cada view sai como "app" no Server-Timing
+time_views(app)
+
 # ============ INICIALIZAÇÃO ============
 
+PRODUCT_SEED_COLUMNS = ('name', 'description', 'price', 'original_price', 'stock', 'image_url')
+SYNTHETIC_BATCH_SIZE = 10000
+
+def insert_missing(model, rows, key):
+    # INSERT em lote com ON CONFLICT (key) DO NOTHING; devolve os ids inseridos
+    dialect = db.session.get_bind().dialect.name
+    insert = postgresql_insert if dialect == 'postgresql' else sqlite_insert
+    statement = insert(model).on_conflict_do_nothing(index_elements=[key]).returning(model.id)
+    return db.session.execute(statement, rows).scalars().all()
+
+def mark_catalog_changed():
+    # INSERT em lote não passa pelo after_flush de bump_catalog_version
+    db.session.execute(db.update(CatalogVersion).values(
+        version=CatalogVersion.version + 1,
+        updated_at=datetime.utcnow()
+    ))
+    db.session.info['catalog_changed'] = True
+
+def seed_database():
+    # Idempotente: categorias por slug, produtos de exemplo só com o catálogo
+    # vazio e o admin só se o email não existir (único caso em que há hash)
+    seeded = {'categories': 0, 'products': 0, 'admin': False}
+    seeded['categories'] = len(insert_missing(Category, SEED_CATEGORIES, 'slug'))
+    
+    if db.session.execute(db.select(Product.id).limit(1)).first() is None:
+        category_ids = dict(db.session.execute(db.select(Category.slug, Category.id)).all())
+        rows = [
+            dict({column: product.get(column) for column in PRODUCT_SEED_COLUMNS},
+                 category_id=category_ids.get(product['category']),
+                 is_featured=product.get('is_featured', False))
+            for product in SEED_PRODUCTS
+        ]
+        product_ids = db.session.execute(db.insert(Product).returning(Product.id), rows).scalars().all()
+        # INSERT em lote não passa pelos hooks de flush: o índice de busca
+        # é atualizado aqui
+        reindex_products(db.session.connection(), product_ids)
+        seeded['products'] = len(product_ids)
+    
+    if seeded['categories'] or seeded['products']:
+        mark_catalog_changed()
+    
+    admin_email = normalize_email(SEED_ADMIN['email'])
+    if db.session.execute(db.select(User.id).filter(User.email == admin_email)).first() is None:
+        admin = User(name=SEED_ADMIN['name'], email=admin_email, is_admin=True)
+        admin.set_password(SEED_ADMIN['password'])
+        db.session.add(admin)
+        seeded['admin'] = True
+    
+    db.session.commit()
+    return seeded
+
+def bootstrap():
+    # Schema e dados iniciais, uma vez por deploy, fora do import do app. O
+    # lock impede dois processos de migrarem ou semearem ao mesmo tempo.
+    with migration_lock(db.engine):
+        applied = migrate(db.engine, db.metadata)
+        seeded = seed_database()
+    return applied, seeded
+
+@app.cli.command('bootstrap')
+def bootstrap_command():
+    with app.app_context():
+        applied, seeded = bootstrap()
+    for version, description in applied:
+        print(f'✅ Migração {version}: {description}')
+    print(f"✅ Seed: {seeded['categories']} categorias, {seeded['products']} produtos"
+          f"{', admin criado' if seeded['admin'] else ''}")
+
+def seed_synthetic(total):
+    # Completa o catálogo com produtos sintéticos até ter total produtos
+    # (idempotente, como o bootstrap); um commit por lote, para catálogos de
+    # milhões de linhas não virarem uma transação só
+    category_ids = dict(db.session.execute(db.select(Category.slug, Category.id)).all())
+    slugs = sorted(category_ids)
+    existing = db.session.execute(db.select(db.func.count(Product.id))).scalar()
+    for start in range(existing, total, SYNTHETIC_BATCH_SIZE):
+        rows = synthetic_products(start, min(SYNTHETIC_BATCH_SIZE, total - start), slugs)
+        for row in rows:
+            row['category_id'] = category_ids[row.pop('category')]
+        # render_nulls: sem ele o ORM tira original_price=None das linhas e o lote
+        # vira um INSERT por sequência de linhas com as mesmas colunas
+        product_ids = db.session.execute(
+            db.insert(Product).returning(Product.id).execution_options(render_nulls=True), rows
+        ).scalars().all()
+        reindex_products(db.session.connection(), product_ids)
+        mark_catalog_changed()
+        db.session.commit()
+    return max(total - existing, 0), max(total, existing)
+
+@app.cli.command('seed-synthetic')
+@click.option('--products', type=int, default=1000, show_default=True,
+              help='Total de produtos que o catálogo deve ter')
+def seed_synthetic_command(products):
+    with app.app_context():
+        with migration_lock(db.engine):
+            inserted, total = seed_synthetic(products)
+    print(f'✅ Catálogo sintético: {inserted} produtos inseridos ({total} no total)')
+
+# Listagens cujo número de consultas não pode depender do tamanho do catálogo
+# (categorias no JOIN, sem uma consulta por produto ou por categoria)
+QUERY_SCALING_PATHS = [
+    '/api/products',
+    '/api/products?limit=100',
+    '/api/products?featured=true',
+    '/api/products?category=alfaiataria&sort=price_asc',
+    '/api/products?sort=name&min_price=100&max_price=300',
+]
+
+@app.cli.command('check-query-scaling')
+@click.option('--small', type=int, default=len(SEED_PRODUCTS), show_default=True,
+              help='Produtos no catálogo na primeira medição')
+@click.option('--large', type=int, default=60000, show_default=True,
+              help='Produtos no catálogo na segunda medição')
+def check_query_scaling_command(small, large):
+    # Completa o catálogo com produtos sintéticos até --small, conta as
+    # consultas de cada listagem, completa até --large e conta de novo. Altera
+    # o banco: use um banco descartável (DATABASE_URL) que já passou pelo bootstrap.
+    client = app.test_client()
+    counts = {}
+    for size in (small, large):
+        with app.app_context():
+            with migration_lock(db.engine):
+                _, total = seed_synthetic(size)
+        if total != size:
+            print(f'❌ O catálogo já tem {total} produtos, mais que {size}: use um banco novo')
+            sys.exit(1)
+        for path in QUERY_SCALING_PATHS:
+            clear_catalog_caches()
+            with capture_queries() as statements:
+                status = client.get(path).status_code
+            if status != 200:
+                print(f'❌ {path}: status {status} com {size} produtos')
+                sys.exit(1)
+            counts.setdefault(path, []).append(len(statements))
+    
+    failed = False
+    for path, (at_small, at_large) in counts.items():
+        failed = failed or at_small != at_large
+        print(f"{'❌' if at_small != at_large else '✅'} {path}: {at_small} consultas com {small} "
+              f"produtos, {at_large} com {large}")
+    if failed:
+        sys.exit(1)
+
 def init_db():
     with app.app_context():
-        db.create_all()
-        
-        # Criar categorias padrão
-        if not Category.query.first():
-            categories = [
-                Category(name='Alfaiataria', slug='alfaiataria', description='Peças sob medida e elegantes'),
-                Category(name='Moda Social', slug='moda-social', description='Para eventos especiais'),
-                Category(name='Looks Elegantes', slug='looks-elegantes', description='Sofisticação no dia a dia')
-            ]
-            for cat in categories:
-                db.session.add(cat)
-        
-        # Criar produtos de exemplo
-        if not Product.query.first():
-            products = [
-                Product(
-                    name='Blazer Premium Alfaiataria',
-                    description='Blazer elegante em alfaiataria premium, confeccionado com tecidos nobres e acabamento impecável. Ideal para mulheres que buscam sofisticação e elegância no ambiente corporativo.',
-                    price=599.90,
-                    original_price=799.90,
-                    category_id=1,
-                    stock=10,
-                    is_featured=True,
-                    image_url='https://images.unsplash.com/photo-1594633312681-425c7b97ccd1?w=500'
-                ),
-                Product(
-                    name='Vestido Social Executivo',
-                    description='Vestido social para eventos especiais e ambiente corporativo. Corte moderno que valoriza a silhueta feminina com elegância e sofisticação.',
-                    price=299.90,
-                    original_price=399.90,
-                    category_id=2,
-                    stock=15,
-                    is_featured=True,
-                    image_url='https://images.unsplash.com/photo-1515372039744-b8f02a3ae446?w=500'
+        bootstrap()
+    print("✅ Banco de dados inicializado!")
+
+if __name__ == '__main__':
+    init_db()
+    port = int(os.environ.get('PORT', 5000))
+    app.run(host='0.0.0.0', port=port, debug=False)""")
+
+    # asgi.py (modo assíncrono: catálogo com driver async, resto via Flask)
+    create_file(f"{base}/backend/asgi.py", """from io import BytesIO
+import os
+import sys
+import time
+
+from a2wsgi import WSGIMiddleware
+from flask import jsonify, make_response
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import (
+    CATALOG_VERSION_QUERY, HEALTH, SQLITE_PRAGMAS, Category, InvalidCursor, InvalidFields, InvalidParameter, Product,
+    app, cached_catalog_version, cached_category_fragments, catalog_lookup, catalog_query,
+    catalog_store, db, init_db, json_body, products_listing, products_listing_body,
+    requested_fields, store_catalog_version, store_category_fragments
+)
+from serializers import ProductSerializer, encode_array, encode_object
+from sqlite_profile import apply_pragmas, read_only_url
+from timing import timed
+
+# Servidor ASGI (uvicorn) para o mesmo app: health e as rotas de leitura do
+# catálogo rodam no event loop com driver assíncrono; todo o resto (login,
+# admin, busca) continua no Flask, em threads, via a2wsgi. As rotas daqui
+# usam as mesmas funções do app.py para montar consultas, cache, cabeçalhos
+# e corpo, e rodam dentro de um request context do Flask, então as
+# respostas são idênticas às do modo síncrono.
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+_engine = None
+
+
+def engine():
+    # Criado no primeiro uso, já dentro do event loop do worker
+    global _engine
+    if _engine is None:
+        with app.app_context():
+            # Mesmo banco do app síncrono (no SQLite, o caminho já resolvido para instance/)
+            url = db.engine.url
+        url = url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+        read_only = url.get_backend_name() == 'sqlite' and app.config['SQLITE_READONLY_GETS']
+        if read_only:
+            # Daqui só saem leituras (GETs do catálogo)
+            url = read_only_url(url)
+        options = {}
+        if url.get_backend_name() != 'sqlite':
+            options = {
+                'pool_size': app.config['ASYNC_DB_POOL_SIZE'],
+                'max_overflow': app.config['ASYNC_DB_MAX_OVERFLOW'],
+                'pool_timeout': app.config['DB_POOL_TIMEOUT'],
+                'pool_pre_ping': app.config['DB_POOL_PRE_PING'],
+                'pool_recycle': app.config['DB_POOL_RECYCLE'],
+                'connect_args': {
+                    'timeout': app.config['DB_CONNECT_TIMEOUT'],
+                    'server_settings': {'statement_timeout': str(app.config['DB_STATEMENT_TIMEOUT_MS'])}
+                }
+            }
+        _engine = create_async_engine(url, **options)
+        if url.get_backend_name() == 'sqlite':
+            apply_pragmas(_engine.sync_engine, SQLITE_PRAGMAS, read_only=read_only)
+    return _engine
+
+
+async def catalog_version(session):
+    state = cached_catalog_version()
+    if state is None:
+        now = time.monotonic()
+        state = store_catalog_version((await session.execute(CATALOG_VERSION_QUERY)).first(), now)
+    return state
+
+
+async def category_fragments(session):
+    version = (await catalog_version(session))['value']
+    fragments = cached_category_fragments(version)
+    if fragments is None:
+        categories = (await session.execute(db.select(Category))).scalars().all()
+        fragments = store_category_fragments(version, categories)
+    return fragments
+
+
+async def product_serializer(session, fields):
+    return ProductSerializer(fields, await category_fragments(session) if 'category' in fields else {})
+
+
+async def get_products(session):
+    try:
+        query, fields, order, limit = products_listing()
+        rows = (await session.execute(query.statement)).all()
+        return products_listing_body(rows, fields, order, limit, await product_serializer(session, fields))
+    except InvalidParameter as e:
+        return jsonify({'message': f'Parâmetro {e} inválido'}), 400
+    except InvalidCursor:
+        return jsonify({'message': 'Cursor inválido'}), 400
+    except InvalidFields as e:
+        return jsonify({'message': f'Campo inválido: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+
+async def get_product(session, id):
+    try:
+        fields = requested_fields(Product.FIELDS)
+        query = catalog_query(fields).filter(Product.id == id).limit(1)
+        row = (await session.execute(query.statement)).first()
+
+        if not row:
+            return jsonify({'message': 'Produto não encontrado'}), 404
+
+        serializer = await product_serializer(session, fields)
+        with timed('serialize'):
+            body = encode_object([('product', serializer.encode(row))])
+        return json_body(body)
+    except InvalidFields as e:
+        return jsonify({'message': f'Campo inválido: {e}'}), 400
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+
+async def get_categories(session):
+    try:
+        fragments = await category_fragments(session)
+        with timed('serialize'):
+            body = encode_object([('categories', encode_array(fragments.values()))])
+        return json_body(body)
+    except Exception as e:
+        return jsonify({'message': f'Erro interno: {str(e)}'}), 500
+
+
+async def catalog_response(view, *args):
+    # Equivalente assíncrono de catalog_cached: a sessão só abre conexão se
+    # a versão precisar ser relida ou a resposta não estiver em cache
+    async with AsyncSession(engine()) as session:
+        response, entry = catalog_lookup(await catalog_version(session))
+        if response is None:
+            response = catalog_store(make_response(await view(session, *args)), entry)
+    return response
+
+
+async def health():
+    return make_response(HEALTH)
+
+
+PRODUCT_PREFIX = '/api/products/'
+
+
+def route(path):
+    # Devolve (handler, args) das rotas atendidas aqui; None segue para o Flask
+    if path == '/api/health':
+        return health, ()
+    if path == '/api/products':
+        return catalog_response, (get_products,)
+    if path == '/api/categories':
+        return catalog_response, (get_categories,)
+    if path.startswith(PRODUCT_PREFIX):
+        # Mesmo critério do conversor <int:id> do Flask
+        id = path[len(PRODUCT_PREFIX):]
+        if id.isascii() and id.isdigit():
+            return catalog_response, (get_product, int(id))
+    return None
+
+
+def wsgi_environ(scope):
+    # O suficiente para o Flask montar request (args, headers) e rodar os
+    # after_request (CORS, compressão) como no modo síncrono
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        key = name if name in ('CONTENT_TYPE', 'CONTENT_LENGTH') else 'HTTP_' + name
+        value = value.decode('latin-1')
+        environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+async def dispatch(handler, args, environ):
+    with app.request_context(environ):
+        try:
+            response = app.preprocess_request()
+            if response is None:
+                with timed('app'):
+                    response = await handler(*args)
+        except Exception as e:
+            response = app.handle_exception(e)
+        response = app.process_response(make_response(response))
+        # Cabeçalhos e corpo finais como o WSGI entregaria (ex.: 304 sem corpo)
+        headers = response.get_wsgi_headers(environ)
+        body = b''.join(response.get_app_iter(environ))
+        return response.status_code, headers, body
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            if _engine is not None:
+                await _engine.dispose()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+flask_app = WSGIMiddleware(app)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    found = route(scope['path']) if scope['type'] == 'http' and scope['method'] == 'GET' else None
+    if found is None:
+        return await flask_app(scope, receive, send)
+
+    status, headers, body = await dispatch(found[0], found[1], wsgi_environ(scope))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers.to_wsgi_list()]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    init_db()
+    port = int(os.environ.get('PORT', 5000))
+    uvicorn.run(application, host='0.0.0.0', port=port)""")
+
+    # cache.py (cache LRU/TTL local a cada worker)
+    create_file(f"{base}/backend/cache.py", """from collections import OrderedDict
+import threading
+import time
+
+
+class VersionedCache:
+    # Cache LRU com TTL, local a cada worker (respostas do catálogo, usuários
+    # autenticados). Cada entrada pertence a uma versão dos dados: quando a
+    # versão muda, todo o conteúdo é descartado de uma vez.
+
+    def __init__(self, max_entries=512, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+                self._entries.clear()
+            self.version = version
+
+    def get(self, key, version):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, version, value):
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'version': self.version,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }""")
+
+    # revocation.py (tokens revogados em memória, sincronizados do banco)
+    create_file(f"{base}/backend/revocation.py", """import threading
+import time
+
+
+class RevocationList:
+    # Revogações de JWT em memória, uma cópia por worker. A tabela
+    # token_revocation é a fonte da verdade; load() recebe as linhas novas e
+    # cada entrada sai da memória quando os tokens que ela bloqueia já
+    # expiraram sozinhos. is_revoked() é O(1): um dict de jti e um dict de
+    # cortes por usuário (None = todos os usuários).
+
+    def __init__(self, sync_interval=1):
+        self.sync_interval = sync_interval
+        self.last_id = 0
+        self.synced_at = 0.0
+        self.syncs = 0
+        self.revoked_hits = 0
+        self._jtis = {}
+        self._cutoffs = {}
+        self._lock = threading.Lock()
+
+    def due(self):
+        return time.monotonic() - self.synced_at >= self.sync_interval
+
+    def load(self, rows, now):
+        # rows: (id, jti, user_id, issued_before, expires), em qualquer ordem
+        # e possivelmente repetidas
+        with self._lock:
+            for row_id, jti, user_id, issued_before, expires in rows:
+                if jti is not None:
+                    self._jtis[jti] = expires
+                else:
+                    key = None if user_id is None else str(user_id)
+                    current = self._cutoffs.get(key)
+                    if current is None or issued_before >= current[0]:
+                        self._cutoffs[key] = (issued_before, expires)
+                self.last_id = max(self.last_id, row_id)
+            self._prune(now)
+            self.synced_at = time.monotonic()
+            self.syncs += 1
+
+    def _prune(self, now):
+        for jti in [j for j, expires in self._jtis.items() if expires <= now]:
+            del self._jtis[jti]
+        for key in [k for k, cutoff in self._cutoffs.items() if cutoff[1] <= now]:
+            del self._cutoffs[key]
+
+    def is_revoked(self, jti, user_id, issued_at):
+        revoked = jti in self._jtis
+        if not revoked:
+            # iat tem resolução de segundos: um token emitido no mesmo segundo
+            # do corte também é revogado
+            for key in (user_id, None):
+                cutoff = self._cutoffs.get(key)
+                if cutoff is not None and issued_at <= cutoff[0]:
+                    revoked = True
+                    break
+        if revoked:
+            self.revoked_hits += 1
+        return revoked
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tokens': len(self._jtis),
+                'cutoffs': len(self._cutoffs),
+                'last_id': self.last_id,
+                'sync_interval': self.sync_interval,
+                'syncs': self.syncs,
+                'revoked_hits': self.revoked_hits
+            }""")
+
+    # search.py (índice de busca textual: FTS5 no SQLite, tsvector/GIN no PostgreSQL)
+    create_file(f"{base}/backend/search.py", """from functools import lru_cache
+import re
+import unicodedata
+
+from sqlalchemy import bindparam, text
+
+
+def fold(value):
+    # Minúsculas e sem acentos: 'Alfaiatária' -> 'alfaiataria'
+    value = unicodedata.normalize('NFKD', value or '')
+    return ''.join(c for c in value if not unicodedata.combining(c)).lower()
+
+
+def tokens(value):
+    return re.findall('[0-9a-z]+', fold(value))
+
+
+PLURAL_SUFFIXES = (
+    ('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'),
+    ('ns', 'm'), ('res', 'r'), ('les', 'l'), ('zes', 'z'),
+)
+DEGREE_SUFFIXES = ('issima', 'issimo', 'zinha', 'zinho', 'inha', 'inho')
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    # Radicalizador leve para português (plural, grau e gênero), aplicado
+    # igualmente aos documentos e às buscas
+    if len(word) < 4:
+        return word
+
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if word.endswith(suffix):
+            word = word[:-len(suffix)] + replacement
+            break
+    else:
+        if word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+
+    for suffix in DEGREE_SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            break
+
+    if len(word) > 3 and word[-1] in 'aeo':
+        word = word[:-1]
+    return word
+
+
+def analyze(value):
+    return ' '.join(stem(t) for t in tokens(value))
+
+
+class SQLiteSearchIndex:
+    # Tabela FTS5 com rowid = product.id; o texto já chega radicalizado
+
+    def create(self, connection):
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS product_search "
+            "USING fts5(name, description, category, tokenize='unicode61 remove_diacritics 2')"
+        ))
+
+    def replace(self, connection, rows):
+        self.delete(connection, [row[0] for row in rows])
+        if rows:
+            connection.execute(
+                text(
+                    'INSERT INTO product_search (rowid, name, description, category) '
+                    'VALUES (:id, :name, :description, :category)'
                 ),
-                Product(
-                    name='Conjunto Executivo Completo',
-                    description='Conjunto completo para ambiente corporativo, composto por blazer e calça ou saia. Perfeito para mulheres executivas que valorizam elegância e profissionalismo.',
-                    price=899.90,
-                    original_price=1199.90,
-                    category_id=3,
-                    stock=8,
-                    is_featured=True,
-                    image_url='https://images.unsplash.com/photo-1573496359142-b8d87734a5a2?w=500'
+                [
+                    {'id': product_id, 'name': analyze(name), 'description': analyze(description),
+                     'category': analyze(category)}
+                    for product_id, name, description, category in rows
+                ]
+            )
+
+    def delete(self, connection, ids):
+        if ids:
+            connection.execute(
+                text('DELETE FROM product_search WHERE rowid IN :ids').bindparams(
+                    bindparam('ids', expanding=True)
                 ),
-                Product(
-                    name='Saia Lápis Clássica',
-                    description='Saia lápis clássica e elegante, peça fundamental no guarda-roupa feminino. Corte que valoriza as curvas com sofisticação e classe.',
-                    price=199.90,
-                    category_id=1,
-                    stock=20,
-                    image_url='https://images.unsplash.com/photo-1583496661160-fb5886a13d77?w=500'
+                {'ids': list(ids)}
+            )
+
+    def search(self, connection, q, limit, offset=0):
+        terms = [stem(t) for t in tokens(q)]
+        if not terms:
+            return []
+
+        # Cada termo vira prefixo ("vestid"*) e todos precisam aparecer
+        match = ' '.join('"%s"*' % t for t in terms)
+        return connection.execute(
+            text(
+                'SELECT s.rowid FROM product_search s JOIN product p ON p.id = s.rowid '
+                'WHERE product_search MATCH :match AND p.is_active '
+                'ORDER BY bm25(product_search, 10.0, 1.0, 4.0), s.rowid '
+                'LIMIT :limit OFFSET :offset'
+            ),
+            {'match': match, 'limit': limit, 'offset': offset}
+        ).scalars().all()
+
+
+class PostgresSearchIndex:
+    # tsvector com o dicionário 'portuguese' (radicalização do próprio
+    # PostgreSQL) sobre o texto já sem acentos, indexado com GIN
+
+    def create(self, connection):
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS product_search ('
+            'product_id INTEGER PRIMARY KEY REFERENCES product (id) ON DELETE CASCADE, '
+            'document TSVECTOR NOT NULL)'
+        ))
+        connection.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_product_search_document '
+            'ON product_search USING GIN (document)'
+        ))
+
+    def replace(self, connection, rows):
+        if rows:
+            connection.execute(
+                text(
+                    'INSERT INTO product_search (product_id, document) VALUES (:id, '
+                    "setweight(to_tsvector('portuguese', :name), 'A') || "
+                    "setweight(to_tsvector('portuguese', :category), 'B') || "
+                    "setweight(to_tsvector('portuguese', :description), 'C')) "
+                    'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document'
                 ),
-                Product(
-                    name='Camisa Social Feminina',
-                    description='Camisa social feminina com corte moderno e elegante. Tecido de alta qualidade que proporciona conforto e sofisticação.',
-                    price=149.90,
-                    category_id=2,
-                    stock=25,
-                    image_url='https://images.unsplash.com/photo-1551698618-1dfe5d97d256?w=500'
+                [
+                    {'id': product_id, 'name': fold(name), 'description': fold(description),
+                     'category': fold(category)}
+                    for product_id, name, description, category in rows
+                ]
+            )
+
+    def delete(self, connection, ids):
+        if ids:
+            connection.execute(
+                text('DELETE FROM product_search WHERE product_id IN :ids').bindparams(
+                    bindparam('ids', expanding=True)
                 ),
-                Product(
-                    name='Vestido Midi Elegante',
-                    description='Vestido midi elegante para ocasiões especiais. Design sofisticado que combina conforto e elegância em uma peça única.',
-                    price=349.90,
-                    category_id=3,
-                    stock=12,
-                    image_url='https://images.unsplash.com/photo-1566479179817-c0b7b8b5e3b5?w=500'
-                )
-            ]
-            for prod in products:
-                db.session.add(prod)
-        
-        # Criar admin padrão
-        if not User.query.filter_by(email='admin@jessicasantanna.com.br').first():
-            admin = User(
-                name='Jéssica Santana',
-                email='admin@jessicasantanna.com.br',
-                is_admin=True
+                {'ids': list(ids)}
+            )
+
+    def search(self, connection, q, limit, offset=0):
+        terms = tokens(q)
+        if not terms:
+            return []
+
+        query = ' & '.join('%s:*' % t for t in terms)
+        return connection.execute(
+            text(
+                'SELECT s.product_id FROM product_search s '
+                'JOIN product p ON p.id = s.product_id, '
+                "to_tsquery('portuguese', :query) q "
+                'WHERE s.document @@ q AND p.is_active '
+                'ORDER BY ts_rank(s.document, q) DESC, s.product_id '
+                'LIMIT :limit OFFSET :offset'
+            ),
+            {'query': query, 'limit': limit, 'offset': offset}
+        ).scalars().all()
+
+
+SEARCH_INDEXES = {
+    'sqlite': SQLiteSearchIndex(),
+    'postgresql': PostgresSearchIndex(),
+}
+
+
+def search_index_for(dialect_name):
+    return SEARCH_INDEXES[dialect_name]""")
+
+    # metrics.py (métricas do Prometheus somadas entre os workers)
+    create_file(f"{base}/backend/metrics.py", """import os
+import threading
+import time
+
+# Com vários processos (workers do gunicorn ou do uvicorn) cada um grava seus
+# valores em arquivos mmap em PROMETHEUS_MULTIPROC_DIR e o /metrics soma os de
+# todos. A variável precisa estar definida antes do import do prometheus_client.
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from flask import g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import generate_latest, multiprocess
+
+REQUESTS = Counter('http_requests_total', 'Requisições HTTP atendidas', ['method', 'route', 'status'])
+LATENCY = Histogram('http_request_duration_seconds', 'Duração das requisições HTTP', ['method', 'route'])
+IN_FLIGHT = Gauge('http_requests_in_flight', 'Requisições em andamento', multiprocess_mode='livesum')
+
+
+def instrument_requests(app):
+    # Registrar antes dos outros hooks do app: este before_request roda
+    # primeiro e o after_request por último, já com o status final (erros
+    # não tratados também passam por ele, como resposta 500)
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        IN_FLIGHT.inc()
+        start_exporter(app.logger)
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            IN_FLIGHT.dec()
+            # Rota como registrada (/api/products/<int:id>), não o path: um
+            # label por rota, não por produto
+            rule = request.url_rule
+            route = rule.rule if rule is not None else 'unmatched'
+            method = request.method
+            LATENCY.labels(method, route).observe(time.perf_counter() - start)
+            REQUESTS.labels(method, route, str(response.status_code)).inc()
+        return response
+
+
+class StatsCounter:
+    # Contadores que o processo já acumula (stats() dos caches, do pool)
+    # repassados ao Prometheus como incrementos desde o último valor visto
+
+    def __init__(self, counter):
+        self.counter = counter
+        self._last = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, *labels):
+        with self._lock:
+            delta = value - self._last.get(labels, 0)
+            if delta > 0:
+                (self.counter.labels(*labels) if labels else self.counter).inc(delta)
+            self._last[labels] = value
+
+
+_exporter = {'pid': None, 'export': None, 'interval': 1.0}
+_exporter_lock = threading.Lock()
+
+
+def export_periodically(export, interval):
+    # export() publica números que o processo acumula por conta própria
+    _exporter.update(export=export, interval=interval)
+
+
+def start_exporter(logger):
+    # Uma thread por processo, iniciada já no worker (depois do fork), que
+    # chama export() a cada intervalo mesmo com o worker ocioso
+    if _exporter['pid'] == os.getpid() or _exporter['export'] is None:
+        return
+    with _exporter_lock:
+        if _exporter['pid'] == os.getpid():
+            return
+        _exporter['pid'] = os.getpid()
+
+    def run():
+        while True:
+            time.sleep(_exporter['interval'])
+            try:
+                _exporter['export']()
+            except Exception as e:
+                logger.warning('Falha ao exportar métricas: %s', e)
+
+    threading.Thread(target=run, name='metrics-exporter', daemon=True).start()
+
+
+def render_metrics():
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST""")
+
+    # migrations.py (migrações versionadas do schema)
+    create_file(f"{base}/backend/migrations.py", """from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from search import search_index_for
+
+# Migrações aplicadas em ordem e registradas em schema_migrations. Cada uma
+# roda em sua própria transação e só acrescenta (colunas, índices, tabelas),
+# então pode ser aplicada sobre o banco de produção sem perder dados.
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+def has_column(connection, table, column):
+    return column in {c['name'] for c in inspect(connection).get_columns(table)}
+
+
+def add_column(connection, table, column, ddl):
+    if not has_column(connection, table, column):
+        connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def disable_statement_timeout(connection):
+    # O engine do app cancela consultas após DB_STATEMENT_TIMEOUT_MS; um CREATE
+    # INDEX em catálogo grande ou a espera pelo lock enquanto outra instância
+    # migra não podem ser cancelados no meio do deploy (só nesta transação)
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('SET LOCAL statement_timeout = 0'))
+
+
+def create_index(connection, name, table, columns, unique=False):
+    connection.execute(text(
+        f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    ))
+
+
+@migration(1, 'tabelas iniciais')
+def create_tables(connection, metadata):
+    # Em um banco novo cria o schema atual inteiro; em um banco existente só
+    # as tabelas que ainda não existem (create_all nunca altera tabelas)
+    metadata.create_all(connection)
+
+
+@migration(2, 'updated_at em product e category')
+def add_updated_at(connection, metadata):
+    add_column(connection, 'product', 'updated_at', 'TIMESTAMP')
+    add_column(connection, 'category', 'updated_at', 'TIMESTAMP')
+    connection.execute(text('UPDATE product SET updated_at = created_at WHERE updated_at IS NULL'))
+    connection.execute(text('UPDATE category SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL'))
+
+
+@migration(3, 'versão do catálogo')
+def seed_catalog_version(connection, metadata):
+    connection.execute(text(
+        'INSERT INTO catalog_version (id, version, updated_at) '
+        'SELECT 1, 0, CURRENT_TIMESTAMP WHERE NOT EXISTS (SELECT 1 FROM catalog_version)'
+    ))
+
+
+@migration(4, 'índices das consultas do catálogo')
+def create_catalog_indexes(connection, metadata):
+    create_index(connection, 'ix_category_slug', 'category', ['slug'], unique=True)
+    create_index(connection, 'ix_product_category_id', 'product', ['category_id'])
+    create_index(connection, 'ix_product_active_created_id', 'product', ['is_active', 'created_at', 'id'])
+    create_index(connection, 'ix_product_active_category_created', 'product',
+                 ['is_active', 'category_id', 'created_at', 'id'])
+    create_index(connection, 'ix_product_active_featured_created', 'product',
+                 ['is_active', 'is_featured', 'created_at', 'id'])
+    create_index(connection, 'ix_product_active_price', 'product', ['is_active', 'price', 'id'])
+    create_index(connection, 'ix_product_active_category_price', 'product',
+                 ['is_active', 'category_id', 'price', 'id'])
+
+
+@migration(5, 'índice de busca textual')
+def create_search_index(connection, metadata):
+    index = search_index_for(connection.dialect.name)
+    index.create(connection)
+    rows = connection.execute(text(
+        'SELECT p.id, p.name, p.description, c.name FROM product p '
+        'LEFT JOIN category c ON c.id = p.category_id'
+    )).all()
+    index.replace(connection, rows)
+
+
+@migration(6, 'email normalizado com índice único')
+def normalize_user_emails(connection, metadata):
+    # Falha (e nada é alterado) se já existirem emails que só diferem na
+    # caixa; esses cadastros precisam ser unificados à mão antes
+    connection.execute(text(
+        'UPDATE "user" SET email = lower(trim(email)) WHERE email <> lower(trim(email))'
+    ))
+    create_index(connection, 'ix_user_email_normalized', '"user"', ['lower(email)'], unique=True)
+
+
+@migration(7, 'tabela de revogação de tokens')
+def create_token_revocation(connection, metadata):
+    metadata.tables['token_revocation'].create(connection, checkfirst=True)
+
+
+@migration(8, 'índices da ordenação por nome')
+def create_name_sort_indexes(connection, metadata):
+    create_index(connection, 'ix_product_active_name', 'product', ['is_active', 'name', 'id'])
+    create_index(connection, 'ix_product_active_category_name', 'product',
+                 ['is_active', 'category_id', 'name', 'id'])
+
+
+# Chave do advisory lock do PostgreSQL usado por migration_lock
+MIGRATION_LOCK_KEY = 7305190
+
+
+@contextmanager
+def migration_lock(engine):
+    # Exclusão mútua entre processos: advisory lock no PostgreSQL, flock em
+    # um arquivo ao lado do banco no SQLite (sem fcntl ou com banco em
+    # memória não há com quem disputar)
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as connection:
+            disable_statement_timeout(connection)
+            connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+            connection.commit()
+            try:
+                yield
+            finally:
+                connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': MIGRATION_LOCK_KEY})
+                connection.commit()
+        return
+
+    database = engine.url.database
+    if fcntl is None or not database or database == ':memory:':
+        yield
+        return
+    with open(database + '.lock', 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def migrate(engine, metadata):
+    with engine.begin() as connection:
+        disable_statement_timeout(connection)
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS schema_migrations ('
+            'version INTEGER PRIMARY KEY, '
+            'description VARCHAR(200) NOT NULL, '
+            'applied_at TIMESTAMP NOT NULL)'
+        ))
+        applied = set(connection.execute(text('SELECT version FROM schema_migrations')).scalars())
+
+    done = []
+    for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if version in applied:
+            continue
+        with engine.begin() as connection:
+            disable_statement_timeout(connection)
+            fn(connection, metadata)
+            connection.execute(
+                text('INSERT INTO schema_migrations (version, description, applied_at) '
+                     'VALUES (:version, :description, :applied_at)'),
+                {'version': version, 'description': description, 'applied_at': datetime.utcnow()}
             )
-            admin.set_password('admin123')
-            db.session.add(admin)
+        done.append((version, description))
+    return done""")
+
+    # seed.py (dados iniciais: categorias, produtos de exemplo e admin)
+    create_file(f"{base}/backend/seed.py", """from datetime import datetime, timedelta
+import os
+
+# Dados iniciais da loja, aplicados por "flask bootstrap" (ver app.bootstrap)
+
+SEED_CATEGORIES = [
+    {'name': 'Alfaiataria', 'slug': 'alfaiataria', 'description': 'Peças sob medida e elegantes'},
+    {'name': 'Moda Social', 'slug': 'moda-social', 'description': 'Para eventos especiais'},
+    {'name': 'Looks Elegantes', 'slug': 'looks-elegantes', 'description': 'Sofisticação no dia a dia'}
+]
+
+# Produtos de exemplo: só entram em um catálogo vazio ('category' é o slug)
+SEED_PRODUCTS = [
+    {
+        'name': 'Blazer Premium Alfaiataria',
+        'description': 'Blazer elegante em alfaiataria premium, confeccionado com tecidos nobres e acabamento impecável. Ideal para mulheres que buscam sofisticação e elegância no ambiente corporativo.',
+        'price': 599.90,
+        'original_price': 799.90,
+        'category': 'alfaiataria',
+        'stock': 10,
+        'is_featured': True,
+        'image_url': 'https://images.unsplash.com/photo-1594633312681-425c7b97ccd1?w=500'
+    },
+    {
+        'name': 'Vestido Social Executivo',
+        'description': 'Vestido social para eventos especiais e ambiente corporativo. Corte moderno que valoriza a silhueta feminina com elegância e sofisticação.',
+        'price': 299.90,
+        'original_price': 399.90,
+        'category': 'moda-social',
+        'stock': 15,
+        'is_featured': True,
+        'image_url': 'https://images.unsplash.com/photo-1515372039744-b8f02a3ae446?w=500'
+    },
+    {
+        'name': 'Conjunto Executivo Completo',
+        'description': 'Conjunto completo para ambiente corporativo, composto por blazer e calça ou saia. Perfeito para mulheres executivas que valorizam elegância e profissionalismo.',
+        'price': 899.90,
+        'original_price': 1199.90,
+        'category': 'looks-elegantes',
+        'stock': 8,
+        'is_featured': True,
+        'image_url': 'https://images.unsplash.com/photo-1573496359142-b8d87734a5a2?w=500'
+    },
+    {
+        'name': 'Saia Lápis Clássica',
+        'description': 'Saia lápis clássica e elegante, peça fundamental no guarda-roupa feminino. Corte que valoriza as curvas com sofisticação e classe.',
+        'price': 199.90,
+        'category': 'alfaiataria',
+        'stock': 20,
+        'image_url': 'https://images.unsplash.com/photo-1583496661160-fb5886a13d77?w=500'
+    },
+    {
+        'name': 'Camisa Social Feminina',
+        'description': 'Camisa social feminina com corte moderno e elegante. Tecido de alta qualidade que proporciona conforto e sofisticação.',
+        'price': 149.90,
+        'category': 'moda-social',
+        'stock': 25,
+        'image_url': 'https://images.unsplash.com/photo-1551698618-1dfe5d97d256?w=500'
+    },
+    {
+        'name': 'Vestido Midi Elegante',
+        'description': 'Vestido midi elegante para ocasiões especiais. Design sofisticado que combina conforto e elegância em uma peça única.',
+        'price': 349.90,
+        'category': 'looks-elegantes',
+        'stock': 12,
+        'image_url': 'https://images.unsplash.com/photo-1566479179817-c0b7b8b5e3b5?w=500'
+    }
+]
+
+SEED_ADMIN = {
+    'name': 'Jéssica Santana',
+    'email': 'admin@jessicasantanna.com.br',
+    'password': os.environ.get('ADMIN_PASSWORD', 'admin123')
+}
+
+# Catálogo sintético para o teste de carga ("flask seed-synthetic", loadtest.py):
+# cada produto é derivado só da sua posição, então dois catálogos do mesmo
+# tamanho são idênticos e os números de execuções diferentes são comparáveis
+SYNTHETIC_PIECES = ('Blazer', 'Vestido', 'Calça', 'Camisa', 'Saia', 'Conjunto', 'Macacão', 'Colete', 'Blusa')
+SYNTHETIC_STYLES = ('Alfaiataria', 'Midi', 'Social', 'Elegante', 'Clássico', 'Premium', 'Executivo')
+SYNTHETIC_COLORS = ('Preto', 'Nude', 'Off-white', 'Marinho', 'Vinho', 'Caramelo', 'Verde Oliva', 'Cinza')
+SYNTHETIC_FABRICS = ('linho', 'crepe', 'viscose', 'lã fria', 'seda', 'algodão')
+SYNTHETIC_EPOCH = datetime(2025, 1, 1)
+
+
+def synthetic_product(index, category_slugs):
+    # Hash multiplicativo do índice no lugar de random: rápido e sem estado
+    h = index * 2654435761 % 4294967296
+    piece = SYNTHETIC_PIECES[h % len(SYNTHETIC_PIECES)]
+    style = SYNTHETIC_STYLES[(h >> 8) % len(SYNTHETIC_STYLES)]
+    color = SYNTHETIC_COLORS[(h >> 12) % len(SYNTHETIC_COLORS)]
+    fabric = SYNTHETIC_FABRICS[(h >> 16) % len(SYNTHETIC_FABRICS)]
+    price = 79.9 + (h >> 20) % 1200
+    return {
+        'name': f'{piece} {style} {color} {index}',
+        'description': f'{piece} {style.lower()} em {fabric}, na cor {color.lower()}. Peça {index} do catálogo sintético.',
+        'price': round(price, 2),
+        'original_price': round(price * 1.25, 2) if (h >> 24) % 5 == 0 else None,
+        'stock': (h >> 4) % 40,
+        'image_url': SEED_PRODUCTS[index % len(SEED_PRODUCTS)]['image_url'],
+        'category': category_slugs[index % len(category_slugs)],
+        'is_featured': index % 97 == 0,
+        'created_at': SYNTHETIC_EPOCH + timedelta(minutes=index)
+    }
+
+
+def synthetic_products(start, count, category_slugs):
+    return [synthetic_product(index, category_slugs) for index in range(start, start + count)]""")
+
+    # serializers.py (serialização rápida das respostas do catálogo)
+    create_file(f"{base}/backend/serializers.py", """from datetime import datetime
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'Tipo não serializável: {type(value).__name__}')
+
+
+# Mesmo formato do jsonify do Flask (chaves ordenadas, sem espaços), com
+# orjson quando instalado e a biblioteca padrão como alternativa
+if orjson is not None:
+    def dumps(value):
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+else:
+    _encoder = json.JSONEncoder(
+        default=_default, ensure_ascii=False, sort_keys=True, separators=(',', ':')
+    )
+
+    def dumps(value):
+        return _encoder.encode(value).encode('utf-8')
+
+
+def encode_array(fragments):
+    return b'[' + b','.join(fragments) + b']'
+
+
+def encode_object(items):
+    # items: pares (chave, JSON já serializado), na ordem em que devem sair
+    return b'{' + b','.join(dumps(key) + b':' + value for key, value in items) + b'}'
+
+
+class ProductSerializer:
+    # Serializa linhas (tuplas) de Product direto para JSON. A categoria é
+    # encaixada a partir de fragmentos pré-serializados por id; como
+    # 'category' é a primeira chave em ordem alfabética, o resultado tem a
+    # mesma ordem de chaves que Product.to_dict() + jsonify.
+
+    def __init__(self, fields, category_fragments):
+        self.columns = tuple(f for f in fields if f != 'category')
+        self.with_category = 'category' in fields
+        self.category_fragments = category_fragments
+
+    def encode(self, row):
+        mapping = row._mapping
+        body = dumps({column: mapping[column] for column in self.columns})
+        if not self.with_category:
+            return body
+
+        category = self.category_fragments.get(mapping['category_id'], b'null')
+        if body == b'{}':
+            return b'{"category":' + category + b'}'
+        return b'{"category":' + category + b',' + body[1:]""")
+
+    # dbpool.py (pool de conexões com medição da espera no checkout)
+    create_file(f"{base}/backend/dbpool.py", """import bisect
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+# Limites (ms) do histograma de espera por uma conexão livre
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class PoolStats:
+    # Espera no checkout acumulada no processo (um pool por worker)
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self._lock = threading.Lock()
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.wait_buckets[bisect.bisect_left(WAIT_BUCKETS_MS, wait * 1000)] += 1
+
+    def snapshot(self, pool):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                'size': pool.size(),
+                'in_use': pool.checkedout(),
+                'idle': pool.checkedin(),
+                # overflow() fica negativo enquanto o pool não encheu
+                'overflow': max(0, pool.overflow()),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total * 1000 / waits, 3) if waits else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                'wait_buckets_ms': dict(zip([str(b) for b in WAIT_BUCKETS_MS] + ['+Inf'], self.wait_buckets))
+            }
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool que mede quanto cada checkout esperou por uma conexão (fila
+    # cheia ou abertura de uma conexão nova)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            pool_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - start)
+        return connection""")
+
+    # replica.py (réplica de leitura com verificação de atraso e fallback)
+    create_file(f"{base}/backend/replica.py", """import logging
+import threading
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+
+# Atraso da réplica em segundos. Sem nada recebido por aplicar o atraso é 0,
+# mesmo que o último commit replicado seja antigo (primário ocioso).
+LAG_QUERIES = {
+    'postgresql': text(
+        'SELECT CASE WHEN NOT pg_is_in_recovery() '
+        'OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+        'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+    )
+}
+DEFAULT_LAG_QUERY = text('SELECT 0')
+
+logger = logging.getLogger(__name__)
+
+
+class Replica:
+    # Réplica de leitura com fallback: available() diz se as leituras podem ir
+    # para ela. O estado é reavaliado no máximo a cada check_interval, por uma
+    # única thread; as outras seguem com o último resultado sem esperar.
+
+    def __init__(self, engine_factory, max_lag, check_interval):
+        self.engine_factory = engine_factory
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.healthy = False
+        self.lag = None
+        self.last_error = None
+        self.checks = 0
+        self.failures = 0
+        self.reads = 0
+        self.fallbacks = 0
+        self._engine = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        # Criado no primeiro uso, já no processo do worker
+        if self._engine is None:
+            with self._lock:
+                self._create_engine()
+        return self._engine
+
+    def _create_engine(self):
+        if self._engine is None:
+            engine = self.engine_factory()
+            event.listen(engine, 'handle_error', self._on_error)
+            self._engine = engine
+
+    def available(self):
+        due = self._checked_at is None or time.monotonic() - self._checked_at >= self.check_interval
+        if due and self._lock.acquire(blocking=False):
+            try:
+                self._check()
+            finally:
+                self._lock.release()
+        if self.healthy:
+            self.reads += 1
+        else:
+            self.fallbacks += 1
+        return self.healthy
+
+    def _check(self):
+        self.checks += 1
+        try:
+            self._create_engine()
+            with self._engine.connect() as connection:
+                query = LAG_QUERIES.get(self._engine.dialect.name, DEFAULT_LAG_QUERY)
+                lag = connection.execute(query).scalar()
+            self.lag = float(lag or 0)
+            self.healthy = self.lag <= self.max_lag
+            self.last_error = None if self.healthy else 'atraso de %.1fs' % self.lag
+        except SQLAlchemyError as e:
+            self.failures += 1
+            self.healthy = False
+            # last_error aparece em /api/db/stats: o detalhe da conexão fica no log
+            logger.warning('Réplica indisponível: %s', e)
+            self.last_error = 'conexão falhou'
+        self._checked_at = time.monotonic()
+
+    def _on_error(self, context):
+        # Conexão perdida no meio de uma requisição: volta ao primário até a
+        # próxima verificação
+        if context.is_disconnect:
+            self.healthy = False
+            self._checked_at = time.monotonic()
+
+    def stats(self):
+        return {
+            'healthy': self.healthy,
+            'lag_s': None if self.lag is None else round(self.lag, 3),
+            'max_lag_s': self.max_lag,
+            'last_error': self.last_error,
+            'checks': self.checks,
+            'failures': self.failures,
+            'reads': self.reads,
+            'fallbacks': self.fallbacks
+        }""")
+
+    # sqlite_profile.py (pragmas do SQLite para vários workers)
+    create_file(f"{base}/backend/sqlite_profile.py", """from sqlalchemy import event
+
+# Perfil do SQLite para vários processos e threads no mesmo arquivo: em WAL
+# leituras não esperam a escrita (e vice-versa), synchronous=NORMAL só
+# sincroniza o disco no checkpoint, e busy_timeout faz uma escrita esperar a
+# vez em vez de falhar com "database is locked".
+
+
+def sqlite_pragmas(config):
+    return [
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', int(config['SQLITE_BUSY_TIMEOUT_MS'])),
+        ('mmap_size', int(config['SQLITE_MMAP_SIZE'])),
+        ('cache_size', int(config['SQLITE_CACHE_SIZE'])),
+    ]
+
+
+def apply_pragmas(engine, pragmas, read_only=False):
+    # Aplicados em toda conexão nova do engine. journal_mode fica gravado no
+    # arquivo e uma conexão somente leitura não pode mudá-lo.
+    if read_only:
+        pragmas = [p for p in pragmas if p[0] != 'journal_mode']
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+        cursor.close()
+
+
+def read_only_url(url):
+    return url.set(database='file:' + url.database, query=dict(url.query, mode='ro', uri='true'))""")
+
+    # timing.py (Server-Timing, log por requisição e consultas lentas)
+    create_file(f"{base}/backend/timing.py", """from contextlib import contextmanager
+from functools import wraps
+import json
+import logging
+import sys
+import threading
+import time
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Tempo de cada requisição: consultas SQL (de qualquer engine: primário,
+# réplica, SQLite somente leitura e o modo assíncrono), view, serialização e
+# compressão. Sai no cabeçalho Server-Timing e numa linha JSON por requisição;
+# consultas lentas vão para um log próprio, sem os valores dos parâmetros.
+
+request_log = logging.getLogger('loja.requests')
+slow_query_log = logging.getLogger('loja.slow_queries')
+
+_settings = {'slow_query_ms': 200.0, 'server_timing': True, 'request_log': True}
+SLOW_QUERY_ROWS = 3
+_capture = threading.local()
+
+
+def stdout_logger(logger):
+    # Uma mensagem por linha, sem prefixo: o formato é o JSON da mensagem
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+class Timings:
+    __slots__ = ('start', 'queries', 'sql', 'spans')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.sql = 0.0
+        self.spans = {}
+
+    def add(self, name, elapsed):
+        self.spans[name] = self.spans.get(name, 0.0) + elapsed
+
+    def server_timing(self, total):
+        # "app" é a view inteira (inclui db e serialize); "total" inclui os hooks
+        metrics = ['db;dur=%.2f;desc="%d consultas"' % (self.sql * 1000, self.queries)]
+        metrics.extend('%s;dur=%.2f' % (name, elapsed * 1000) for name, elapsed in self.spans.items())
+        metrics.append('total;dur=%.2f' % (total * 1000))
+        return ', '.join(metrics)
+
+    def log_fields(self, total):
+        fields = {'duration_ms': round(total * 1000, 2), 'db_queries': self.queries, 'db_ms': round(self.sql * 1000, 2)}
+        for name, elapsed in self.spans.items():
+            fields[name + '_ms'] = round(elapsed * 1000, 2)
+        return fields
+
+
+def current_timings():
+    return g.get('timings') if has_request_context() else None
+
+
+@contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = current_timings()
+        if timings is not None:
+            timings.add(name, time.perf_counter() - start)
+
+
+def redacted(value):
+    # Só o tipo (e o tamanho de textos): parâmetros trazem emails, hashes e tokens
+    if isinstance(value, dict):
+        return {key: redacted(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [redacted(item) for item in value]
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes)):
+        return '<%s:%d>' % (type(value).__name__, len(value))
+    return '<%s>' % type(value).__name__
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop()
+    timings = current_timings()
+    if timings is not None:
+        timings.queries += 1
+        timings.sql += elapsed
+    captured = getattr(_capture, 'statements', None)
+    if captured is not None:
+        captured.append(statement)
+    if elapsed * 1000 >= _settings['slow_query_ms']:
+        slow_query_log.warning(json.dumps({
+            'slow_query_ms': round(elapsed * 1000, 2),
+            'statement': ' '.join(statement.split())[:2000],
+            # executemany: só as primeiras linhas, e quantas eram
+            'parameters': redacted(parameters[:SLOW_QUERY_ROWS] if executemany else parameters),
+            'rows': len(parameters) if executemany else None,
+            'path': request.path if has_request_context() else None
+        }, ensure_ascii=False))
+
+
+def discard_query_start(context):
+    # Consulta que falhou não chega ao after_cursor_execute
+    starts = context.connection.info.get('query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def instrument_queries(slow_query_ms):
+    # Em Engine (a classe): vale para todo engine, inclusive os criados depois
+    _settings['slow_query_ms'] = slow_query_ms
+    if not event.contains(Engine, 'before_cursor_execute', before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+        event.listen(Engine, 'handle_error', discard_query_start)
+    stdout_logger(slow_query_log)
+
+
+def instrument_timings(app, server_timing=True, request_log_enabled=True):
+    # Registrar logo depois de metrics.instrument_requests: o after_request
+    # roda depois dos outros hooks do app (compressão incluída)
+    _settings.update(server_timing=server_timing, request_log=request_log_enabled)
+    stdout_logger(request_log)
+
+    @app.before_request
+    def start_timings():
+        g.timings = Timings()
+
+    @app.after_request
+    def emit_timings(response):
+        timings = g.pop('timings', None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.start
+        if _settings['server_timing']:
+            response.headers['Server-Timing'] = timings.server_timing(total)
+        if _settings['request_log']:
+            fields = {'method': request.method, 'path': request.full_path.rstrip('?'),
+                      'status': response.status_code}
+            fields.update(timings.log_fields(total))
+            request_log.info(json.dumps(fields, ensure_ascii=False))
+        return response
+
+
+def time_views(app):
+    # Chamar depois de registrar todas as rotas: cada view passa a contar como "app"
+    for endpoint, view in list(app.view_functions.items()):
+        app.view_functions[endpoint] = timed_view(view)
+
+
+def timed_view(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        with timed('app'):
+            return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def capture_queries():
+    # Instruções SQL executadas nesta thread enquanto o bloco roda
+    statements = []
+    _capture.statements = statements
+    try:
+        yield statements
+    finally:
+        _capture.statements = None
+
+
+@contextmanager
+def assert_max_queries(limit):
+    # Para testes e para o "flask check-query-budgets": falha se o bloco
+    # fizer mais que limit consultas
+    with capture_queries() as statements:
+        yield statements
+    if len(statements) > limit:
+        listed = ' | '.join(' '.join(statement.split()) for statement in statements)
+        raise AssertionError('%d consultas (máximo %d): %s' % (len(statements), limit, listed))""")
+
+    # profiler.py (perfil por amostragem sob demanda)
+    create_file(f"{base}/backend/profiler.py", """import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from werkzeug.wrappers import Response
+
+# Amostragem de pilhas sob demanda, para administradores: uma thread lê
+# sys._current_frames() a cada 1/rate segundos e conta as pilhas no formato
+# "collapsed" (frames da raiz à folha separados por ';' e o número de
+# amostras), que é a entrada do flamegraph.pl, do speedscope e do inferno.
+# Sem perfil em andamento não existe thread nem hook: o custo é zero.
+
+# Folhas de threads paradas esperando trabalho (pool do gthread, loop do
+# worker, threads de sync): fora dos perfis por janela de tempo
+IDLE_FRAMES = {
+    ('threading.py', 'wait'), ('threading.py', '_wait_for_tstate_lock'),
+    ('selectors.py', 'select'), ('thread.py', '_worker'), ('queue.py', 'get')
+}
+# Threads do próprio app que dormem em time.sleep (a folha não aparece)
+BACKGROUND_THREADS = {'metrics-exporter'}
+
+_switch = {'active': 0, 'previous': None}
+_switch_lock = threading.Lock()
+_labels = {}
+
+
+def short_path(filename):
+    marker = 'site-packages' + os.sep
+    index = filename.rfind(marker)
+    return filename[index + len(marker):] if index >= 0 else os.path.basename(filename)
+
+
+def frame_label(code):
+    label = _labels.get(code)
+    if label is None:
+        name = getattr(code, 'co_qualname', code.co_name)
+        label = _labels[code] = '%s (%s:%d)' % (name, short_path(code.co_filename), code.co_firstlineno)
+    return label
+
+
+def is_idle(frame):
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def collapse(frame):
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    return ';'.join(labels)
+
+
+def lower_switch_interval(interval):
+    # Com o intervalo padrão do GIL (5 ms) a thread de amostragem não acorda
+    # mais que ~200 vezes por segundo enquanto a view ocupa a CPU
+    with _switch_lock:
+        if _switch['active'] == 0:
+            _switch['previous'] = sys.getswitchinterval()
+        _switch['active'] += 1
+        sys.setswitchinterval(min(sys.getswitchinterval(), interval / 2))
+
+
+def restore_switch_interval():
+    with _switch_lock:
+        _switch['active'] -= 1
+        if _switch['active'] == 0:
+            sys.setswitchinterval(_switch['previous'])
+
+
+class Sampler:
+    # threads: idents a amostrar; None amostra todas (menos as ociosas e as
+    # listadas em exclude)
+    def __init__(self, rate, threads=None, exclude=()):
+        self.interval = 1.0 / rate
+        self.threads = threads
+        self.exclude = set(exclude)
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+
+    def start(self):
+        if self.threads is None:
+            self.exclude.update(t.ident for t in threading.enumerate() if t.name in BACKGROUND_THREADS)
+        lower_switch_interval(self.interval)
+        self.started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        restore_switch_interval()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or ident in self.exclude:
+                    continue
+                if self.threads is None:
+                    if is_idle(frame):
+                        continue
+                elif ident not in self.threads:
+                    continue
+                self.stacks[collapse(frame)] += 1
+            self.samples += 1
+
+    def collapsed(self):
+        return ''.join('%s %d\\n' % (stack, count) for stack, count in self.stacks.most_common())
+
+    def response(self, **headers):
+        response = Response(self.collapsed(), mimetype='text/plain')
+        response.headers['X-Profile-Samples'] = str(self.samples)
+        response.headers['X-Profile-Duration-Ms'] = '%.1f' % (self.elapsed * 1000)
+        response.headers['X-Profile-Pid'] = str(os.getpid())
+        for name, value in headers.items():
+            response.headers['X-Profile-' + name.replace('_', '-').title()] = str(value)
+        response.headers['Cache-Control'] = 'no-store'
+        return response
+
+
+def sampling_rate(value, default, maximum):
+    try:
+        rate = float(value) if value else default
+    except (TypeError, ValueError):
+        return None
+    return rate if 0 < rate <= maximum else None
+
+
+class ProfilerMiddleware:
+    # Perfil de uma requisição: com o cabeçalho "X-Profile" (e um token de
+    # administrador) a requisição roda normalmente, mas a resposta vira as
+    # pilhas amostradas dela. Sem o cabeçalho o custo é um lookup no environ.
+    # authorize(environ) devolve None ou a resposta de erro.
+    def __init__(self, wsgi_app, authorize, rate=100, max_rate=1000):
+        self.wsgi_app = wsgi_app
+        self.authorize = authorize
+        self.rate = rate
+        self.max_rate = max_rate
+
+    def __call__(self, environ, start_response):
+        if 'HTTP_X_PROFILE' not in environ:
+            return self.wsgi_app(environ, start_response)
+        denied = self.authorize(environ)
+        if denied is not None:
+            return denied(environ, start_response)
+        rate = sampling_rate(environ.get('HTTP_X_PROFILE_RATE'), self.rate, self.max_rate)
+        if rate is None:
+            message = 'X-Profile-Rate deve estar entre 0 e %d' % self.max_rate
+            return Response(message, status=400, mimetype='text/plain')(environ, start_response)
         
-        db.session.commit()
-        print("✅ Banco de dados inicializado!")
+        status = []
+        def capture_start(code, headers, exc_info=None):
+            status.append(code.split(' ', 1)[0])
+            return lambda data: None
+        
+        sampler = Sampler(rate, threads={threading.get_ident()}).start()
+        try:
+            # O corpo inteiro, inclusive respostas geradas sob demanda
+            body = self.wsgi_app(environ, capture_start)
+            try:
+                for _ in body:
+                    pass
+            finally:
+                if hasattr(body, 'close'):
+                    body.close()
+        finally:
+            sampler.stop()
+        return sampler.response(status=status[0] if status else '')(environ, start_response)""")
+
+    # loadtest.py (teste de carga local com comparação com o baseline)
+    create_file(f"{base}/backend/loadtest.py", """import argparse
+import asyncio
+import gzip
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from seed import SEED_ADMIN, SEED_CATEGORIES
+
+# Teste de carga local e reproduzível da API: sobe o backend (gunicorn com o
+# gunicorn.conf.py de produção, ou uvicorn com asgi.py) contra um SQLite
+# temporário com catálogo sintético, repete uma mistura de requisições
+# parecida com a do site e compara vazão e latências com um baseline salvo.
+# O cliente só usa a biblioteca padrão; nenhum serviço externo.
+#
+#   python loadtest.py --products 10000 --save-baseline
+#   python loadtest.py --products 10000        # sai com 1 se houver regressão
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BACKEND_DIR, 'loadtest-baseline.json')
+
+# Os mesmos parâmetros que o frontend envia (Home.jsx e Products.jsx)
+HOME_FIELDS = 'id,name,price,original_price,image_url'
+CARD_FIELDS = 'id,name,price,original_price,image_url,stock,category'
+PAGE_SIZE = 24
+SORT_WEIGHTS = {'newest': 70, 'price_asc': 12, 'price_desc': 10, 'name': 8}
+CATEGORY_PROBABILITY = 0.5
+NEXT_PAGE_PROBABILITY = 0.3
+
+# Peso de cada requisição na mistura; --mix troca os pesos (ex.: login=0).
+# Login é raro, mas cada um custa um hash de senha inteiro
+DEFAULT_MIX = {'home': 20, 'products': 35, 'categories': 15, 'product': 29, 'login': 1}
+
+# Métricas que contam como regressão (latências: maior é pior; rps: menor é
+# pior). p99 aparece no relatório, mas varia demais entre execuções para barrar.
+GATED_METRICS = ('rps', 'p50', 'p95')
+# Endpoints com menos amostras que isso não são comparados
+MIN_SAMPLES = 200
+# Configuração que precisa ser igual à do baseline para a comparação valer
+COMPARABLE = ('products', 'concurrency', 'workers', 'server', 'mix')
+
+
+class Connection:
+    # HTTP/1.1 com keep-alive, como um navegador reaproveitando a conexão;
+    # respostas com Content-Length ou chunked
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        lines = ['%s %s HTTP/1.1' % (method, path), 'Host: %s:%d' % (self.host, self.port),
+                 'Accept-Encoding: gzip']
+        payload = b''
+        if body is not None:
+            payload = json.dumps(body).encode()
+            lines += ['Content-Type: application/json', 'Content-Length: %d' % len(payload)]
+        self.writer.write(('\\r\\n'.join(lines) + '\\r\\n\\r\\n').encode() + payload)
+
+        head = (await self.reader.readuntil(b'\\r\\n\\r\\n')).decode('latin-1').split('\\r\\n')
+        status = int(head[0].split(' ', 2)[1])
+        headers = {}
+        for line in head[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding') == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\\r\\n')).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            data = b''.join(chunks)
+        else:
+            data = await self.reader.readexactly(int(headers.get('content-length', 0)))
+
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        if headers.get('content-encoding') == 'gzip':
+            data = gzip.decompress(data)
+        return status, data
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class LoadTest:
+    def __init__(self, host, port, mix, max_product_id, seed):
+        self.host = host
+        self.port = port
+        self.kinds = [kind for kind, weight in mix.items() if weight > 0]
+        self.weights = [mix[kind] for kind in self.kinds]
+        self.max_product_id = max_product_id
+        self.seed = seed
+        self.categories = [category['slug'] for category in SEED_CATEGORIES]
+        self.sorts = list(SORT_WEIGHTS)
+        self.sort_weights = list(SORT_WEIGHTS.values())
+        self.latencies = {kind: [] for kind in self.kinds}
+        self.errors = {kind: 0 for kind in self.kinds}
+        # Status de cada erro (None: conexão falhou), para o relatório
+        self.error_statuses = {kind: Counter() for kind in self.kinds}
+
+    def product_id(self, rng):
+        # Popularidade concentrada: ~60% das visitas caem em 20% dos produtos
+        return int(self.max_product_id * rng.random() ** 3) + 1
+
+    def listing_params(self, rng, listing):
+        # Página seguinte da última listagem (quem rola a página) ou uma nova
+        if listing is not None and rng.random() < NEXT_PAGE_PROBABILITY:
+            return listing
+        params = {'limit': PAGE_SIZE, 'sort': rng.choices(self.sorts, self.sort_weights)[0], 'fields': CARD_FIELDS}
+        if rng.random() < CATEGORY_PROBABILITY:
+            params['category'] = rng.choice(self.categories)
+        return params
+
+    def build(self, kind, rng, params):
+        if kind == 'home':
+            return 'GET', '/api/products?' + urlencode({'featured': 'true', 'limit': 3, 'fields': HOME_FIELDS}), None
+        if kind == 'products':
+            return 'GET', '/api/products?' + urlencode(params), None
+        if kind == 'categories':
+            return 'GET', '/api/categories', None
+        if kind == 'product':
+            return 'GET', '/api/products/%d' % self.product_id(rng), None
+        return 'POST', '/api/auth/login', {'email': SEED_ADMIN['email'], 'password': SEED_ADMIN['password']}
+
+    async def user(self, number, measure_from, end):
+        rng = random.Random('%s-%d' % (self.seed, number))
+        connection = Connection(self.host, self.port)
+        listing = None  # parâmetros da próxima página da última listagem
+        while time.perf_counter() < end:
+            kind = rng.choices(self.kinds, self.weights)[0]
+            params = self.listing_params(rng, listing) if kind == 'products' else None
+            method, path, body = self.build(kind, rng, params)
+            start = time.perf_counter()
+            try:
+                status, data = await connection.request(method, path, body)
+            except (OSError, ValueError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                connection.close()
+                status = data = None
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - start
+
+            if start >= measure_from and start < end:
+                if status is not None and status < 400:
+                    self.latencies[kind].append(elapsed)
+                else:
+                    self.errors[kind] += 1
+                    self.error_statuses[kind][status] += 1
+            if kind == 'products':
+                cursor = json.loads(data).get('next_cursor') if status == 200 else None
+                listing = dict(params, cursor=cursor) if cursor else None
+        connection.close()
+
+    async def run(self, concurrency, warmup, duration):
+        start = time.perf_counter()
+        measure_from = start + warmup
+        end = measure_from + duration
+        await asyncio.gather(*[self.user(number, measure_from, end) for number in range(concurrency)])
+
+    def summary(self, duration):
+        results = {}
+        everything = []
+        for kind in self.kinds:
+            latencies = sorted(self.latencies[kind])
+            everything.extend(latencies)
+            results[kind] = summarize(latencies, self.errors[kind], duration)
+        everything.sort()
+        results['total'] = summarize(everything, sum(self.errors.values()), duration)
+        return results
+
+
+def percentile(values, p):
+    # Nearest-rank, sobre a lista já ordenada
+    if not values:
+        return 0.0
+    return values[max(0, min(len(values) - 1, int(math.ceil(p / 100.0 * len(values))) - 1))]
+
+
+def summarize(latencies, errors, duration):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / duration, 1),
+        'p50': round(percentile(latencies, 50) * 1000, 2),
+        'p95': round(percentile(latencies, 95) * 1000, 2),
+        'p99': round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+def parse_mix(value):
+    mix = dict(DEFAULT_MIX)
+    for item in filter(None, (value or '').split(',')):
+        kind, _, weight = item.partition('=')
+        if kind not in DEFAULT_MIX or not weight.isdigit():
+            raise argparse.ArgumentTypeError('mistura inválida: %r (use %s)' % (item, ','.join(
+                '%s=%d' % pair for pair in DEFAULT_MIX.items())))
+        mix[kind] = int(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError('a mistura precisa de pelo menos um peso positivo')
+    return mix
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_environment(args, workdir, db_path, port):
+    env = dict(os.environ)
+    # Sem reciclar workers no meio da medição (o novo worker começa com os
+    # caches vazios); GUNICORN_MAX_REQUESTS no ambiente ainda vale
+    env.setdefault('GUNICORN_MAX_REQUESTS', '0')
+    env.update({
+        'DATABASE_URL': 'sqlite:///' + db_path,
+        'PORT': str(port),
+        'WEB_CONCURRENCY': str(args.workers),
+        # Todas as requisições saem do mesmo IP: o limite de login barraria o teste
+        'AUTH_RATE_LIMIT_ENABLED': '0',
+        'AUTH_RATE_LIMIT_DB': os.path.join(workdir, 'ratelimit.db'),
+        'PROMETHEUS_MULTIPROC_DIR': os.path.join(workdir, 'metrics')
+    })
+    os.makedirs(env['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+    return env
+
+
+def prepare_database(args, env, db_path):
+    # bootstrap e seed-synthetic são idempotentes: com --db um banco já
+    # semeado é reaproveitado e só completado até --products
+    started = time.perf_counter()
+    for command in (['bootstrap'], ['seed-synthetic', '--products', str(args.products)]):
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app'] + command,
+                       cwd=BACKEND_DIR, env=env, check=True)
+    with sqlite3.connect(db_path) as connection:
+        max_product_id = connection.execute('SELECT max(id) FROM product').fetchone()[0]
+    print('Catálogo pronto em %.1f s (maior id: %d)' % (time.perf_counter() - started, max_product_id))
+    return max_product_id
+
+
+def start_server(args, env, port, log):
+    if args.server == 'asgi':
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:application', '--host', '127.0.0.1',
+                   '--port', str(port), '--workers', str(args.workers), '--log-level', 'warning',
+                   '--no-access-log']
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app']
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError('o servidor encerrou ao subir (código %d)' % server.returncode)
+        try:
+            with urlopen('http://127.0.0.1:%d/api/health/ready' % port, timeout=1) as response:
+                if response.status == 200:
+                    return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError('o servidor não ficou pronto em 60 s')
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def print_results(results):
+    print('%-12s %9s %7s %9s %8s %8s %8s' % ('endpoint', 'requests', 'erros', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms'))
+    for kind, row in results.items():
+        print('%-12s %9d %7d %9.1f %8.2f %8.2f %8.2f' % (
+            kind, row['requests'], row['errors'], row['rps'], row['p50'], row['p95'], row['p99']))
+
+
+def compare(baseline, results, threshold):
+    # Devolve as regressões: (endpoint, métrica, antes, depois, variação %)
+    regressions = []
+    print('%-12s %-6s %10s %10s %9s' % ('endpoint', 'métrica', 'baseline', 'atual', 'variação'))
+    for kind, current in results.items():
+        before = baseline['results'].get(kind)
+        if before is None:
+            continue
+        gated = min(before['requests'], current['requests']) >= MIN_SAMPLES
+        for metric in ('rps', 'p50', 'p95', 'p99'):
+            old, new = before[metric], current[metric]
+            change = (new - old) / old * 100 if old else 0.0
+            worse = -change if metric == 'rps' else change
+            regressed = gated and metric in GATED_METRICS and worse > threshold
+            if regressed:
+                regressions.append((kind, metric, old, new, change))
+            print('%-12s %-6s %10.2f %10.2f %+8.1f%%%s' % (kind, metric, old, new, change, '  ❌' if regressed else ''))
+        # Erros onde antes não havia (ou bem mais que antes) também são regressão
+        error_rate = current['errors'] / max(1, current['requests'] + current['errors'])
+        before_rate = before['errors'] / max(1, before['requests'] + before['errors'])
+        if error_rate - before_rate > 0.01:
+            regressions.append((kind, 'erros', before_rate * 100, error_rate * 100, (error_rate - before_rate) * 100))
+            print('%-12s %-6s %9.2f%% %9.2f%%  ❌' % (kind, 'erros', before_rate * 100, error_rate * 100))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga local da API da loja')
+    parser.add_argument('--products', type=int, default=1000, help='tamanho do catálogo sintético (1k a 1M)')
+    parser.add_argument('--duration', type=float, default=30, help='segundos medidos')
+    parser.add_argument('--warmup', type=float, default=5, help='segundos de aquecimento, fora da medição')
+    parser.add_argument('--concurrency', type=int, default=16, help='usuários virtuais simultâneos')
+    parser.add_argument('--workers', type=int, default=2, help='workers do servidor')
+    parser.add_argument('--server', choices=('gunicorn', 'asgi'), default='gunicorn')
+    parser.add_argument('--mix', type=parse_mix, default=dict(DEFAULT_MIX),
+                        help='pesos da mistura, ex.: home=20,products=35,categories=15,product=29,login=1')
+    parser.add_argument('--seed', type=int, default=1, help='semente dos usuários virtuais')
+    parser.add_argument('--db', help='arquivo SQLite a reaproveitar entre execuções (criado se não existir)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='arquivo do baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='grava o resultado como novo baseline')
+    parser.add_argument('--threshold', type=float, default=10, help='piora máxima aceita, em %%')
+    parser.add_argument('--keep', action='store_true', help='mantém o diretório temporário (log do servidor)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='loja-loadtest-')
+    db_path = os.path.abspath(args.db) if args.db else os.path.join(workdir, 'loja.db')
+    port = free_port()
+    env = server_environment(args, workdir, db_path, port)
+    log_path = os.path.join(workdir, 'server.log')
+    server = None
+    try:
+        max_product_id = prepare_database(args, env, db_path)
+        with open(log_path, 'w') as log:
+            server = start_server(args, env, port, log)
+            print('Servidor %s com %d workers na porta %d; %d usuários virtuais, %.0f s + %.0f s de aquecimento' % (
+                args.server, args.workers, port, args.concurrency, args.duration, args.warmup))
+            test = LoadTest('127.0.0.1', port, args.mix, max_product_id, args.seed)
+            asyncio.run(test.run(args.concurrency, args.warmup, args.duration))
+    except (RuntimeError, subprocess.CalledProcessError) as e:
+        print('❌ %s (log em %s)' % (e, log_path))
+        args.keep = True
+        return 2
+    finally:
+        if server is not None:
+            stop_server(server)
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = test.summary(args.duration)
+    print_results(results)
+    for kind, statuses in test.error_statuses.items():
+        if statuses:
+            print('Erros em %s: %s' % (kind, ', '.join(
+                '%s x%d' % (status or 'conexão', count) for status, count in statuses.most_common())))
+    run = {
+        'config': {
+            'products': args.products, 'concurrency': args.concurrency, 'workers': args.workers,
+            'server': args.server, 'mix': args.mix, 'duration': args.duration, 'warmup': args.warmup,
+            'seed': args.seed
+        },
+        'machine': {'cpus': os.cpu_count(), 'python': platform.python_version(), 'platform': platform.platform()},
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'results': results
+    }
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2, ensure_ascii=False)
+        print('✅ Baseline gravado em %s' % args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        print('Sem baseline em %s: rode com --save-baseline para criar um' % args.baseline)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    different = [key for key in COMPARABLE if baseline['config'].get(key) != run['config'][key]]
+    if different:
+        print('❌ Baseline gravado com outra configuração (%s): rode com os mesmos parâmetros ou grave um novo' % (
+            ', '.join(different)))
+        return 2
+    if baseline.get('machine') != run['machine']:
+        print('Aviso: baseline gravado em outra máquina (%s); os números podem não ser comparáveis' % (
+            baseline.get('machine')))
+
+    regressions = compare(baseline, results, args.threshold)
+    if regressions:
+        print('❌ %d regressões acima de %g%% em relação ao baseline de %s' % (
+            len(regressions), args.threshold, baseline.get('created_at')))
+        return 1
+    print('✅ Sem regressões acima de %g%% em relação ao baseline de %s' % (args.threshold, baseline.get('created_at')))
+    return 0
+
 
 if __name__ == '__main__':
-    init_db()
-    port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)""")
+    sys.exit(main())""")
+
+    # compression.py (gzip e brotli)
+    create_file(f"{base}/backend/compression.py", """import gzip
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def available_encodings():
+    # Em ordem de preferência do servidor; brotli só se estiver instalado
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(body, encoding, gzip_level=6, brotli_quality=5):
+    if encoding == 'br':
+        return brotli.compress(body, quality=brotli_quality)
+    # mtime fixo: o mesmo corpo gera sempre os mesmos bytes
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)""")
+
+    # passwords.py (hash de senhas em pool de processos limitado)
+    create_file(f"{base}/backend/passwords.py", """from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import os
+import threading
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordPoolBusy(Exception):
+    pass
+
+
+def _lower_priority():
+    # Hashes disputam CPU com o catálogo: os processos do pool cedem a vez
+    os.nice(10)
+
+
+def _hash(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    # Executa os hashes (caros em CPU e memória) em um pool de processos com
+    # no máximo workers + queue_size pedidos em andamento; além disso recusa
+    # na hora com PasswordPoolBusy. workers=0 calcula no próprio processo.
+
+    def __init__(self, method='scrypt', workers=1, queue_size=4, timeout=5):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(workers + queue_size) if workers else None
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+        self._prefix = None
+
+    def _get_executor(self):
+        # Um pool por processo: após o fork do gunicorn cada worker cria o seu
+        with self._executor_lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_lower_priority
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _discard_executor(self, executor):
+        # Um processo do pool morreu (OOM, sinal): o ProcessPoolExecutor fica
+        # quebrado para sempre, então o próximo pedido cria outro
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, fn, *args):
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(fn, *args)
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+
+        if not self._slots.acquire(blocking=False):
+            raise PasswordPoolBusy()
+        try:
+            executor, future = self._submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A vaga só volta quando o trabalho sai do pool (concluído ou
+        # cancelado), não quando quem pediu desiste de esperar
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Ainda na fila: sai dela. Já em execução: termina e libera a vaga
+            future.cancel()
+            raise PasswordPoolBusy()
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise PasswordPoolBusy()
+
+    def hash(self, password):
+        return self._run(_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(_verify, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        # Compara o prefixo com os parâmetros (ex.: 'scrypt:32768:8:1') de um
+        # hash gerado com a configuração atual
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', method=self.method).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._prefix""")
+
+    # ratelimit.py (token bucket compartilhado entre workers)
+    create_file(f"{base}/backend/ratelimit.py", """import os
+import random
+import sqlite3
+import threading
+import time
+
+
+def parse_rate(rate):
+    # '20/60' -> capacidade de 20 tentativas, repostas em 60 segundos
+    capacity, period = rate.split('/')
+    capacity = float(capacity)
+    return capacity, capacity / float(period)
+
+
+class TokenBucketLimiter:
+    # Token bucket guardado em um arquivo SQLite local: todos os workers do
+    # gunicorn na mesma máquina veem (e consomem) os mesmos baldes. Cada
+    # decisão é uma transação BEGIN IMMEDIATE curta.
+
+    PRUNE_PROBABILITY = 0.001
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def hit(self, key, capacity, refill_rate):
+        # Retorna (permitido, segundos até a próxima tentativa possível)
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + (now - row[1]) * refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                (key, tokens, now)
+            )
+            if random.random() < self.PRUNE_PROBABILITY:
+                # Baldes parados há uma hora já estariam cheios: podem sair
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - 3600,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, 0 if allowed else (1 - tokens) / refill_rate""")
+
+    # requirements-dev.txt (dependências dos testes)
+    create_file(f"{base}/backend/requirements-dev.txt", """-r requirements.txt
+pytest==8.3.3""")
+
+    # pytest.ini
+    create_file(f"{base}/backend/pytest.ini", """[pytest]
+testpaths = tests
+pythonpath = .""")
+
+    # tests/conftest.py (app contra um SQLite temporário)
+    create_file(f"{base}/backend/tests/conftest.py", """import base64
+import json
+import os
+import tempfile
+
+import pytest
+
+# O app lê a configuração do ambiente no import: banco, limites de login e
+# métricas ficam em um diretório temporário, definidos antes de importar app
+workdir = tempfile.mkdtemp(prefix='loja-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'loja.db')
+os.environ['AUTH_RATE_LIMIT_DB'] = os.path.join(workdir, 'ratelimit.db')
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+
+from app import User, app, bootstrap, clear_catalog_caches, issue_tokens  # noqa: E402
+from seed import SEED_ADMIN  # noqa: E402
+
+
+def make_cursor(values):
+    # Cursor montado à mão, como faria um cliente adulterando o next_cursor
+    raw = json.dumps(values).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    with app.app_context():
+        bootstrap()
+
+
+@pytest.fixture
+def client():
+    clear_catalog_caches()
+    return app.test_client()
+
+
+@pytest.fixture(scope='session')
+def admin_headers(database):
+    # Token emitido direto, sem passar pelo login (e pelo limite de tentativas)
+    with app.app_context():
+        admin = User.query.filter_by(email=SEED_ADMIN['email']).one()
+        token = issue_tokens(admin.id)['access_token']
+    return {'Authorization': 'Bearer ' + token}""")
+
+    # tests/test_query_checks.py (verificações de consultas como testes)
+    create_file(f"{base}/backend/tests/test_query_checks.py", """import os
+import subprocess
+import sys
+
+from app import app
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_check(command):
+    result = app.test_cli_runner().invoke(args=[command])
+    assert result.exit_code == 0, result.output
+
+
+def test_query_plans_use_indexes():
+    run_check('check-query-plans')
+
+
+def test_query_budgets():
+    run_check('check-query-budgets')
+
+
+def test_query_count_does_not_grow_with_catalog(tmp_path):
+    # check-query-scaling enche o catálogo até 60.000 produtos: roda em outro
+    # processo, com um banco só dele, para não mexer no banco dos outros testes
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': 'sqlite:///' + str(tmp_path / 'escala.db'),
+        'AUTH_RATE_LIMIT_DB': str(tmp_path / 'ratelimit.db'),
+        'PASSWORD_HASH_WORKERS': '0'
+    })
+    for command in (['bootstrap'], ['check-query-scaling']):
+        result = subprocess.run([sys.executable, '-m', 'flask', '--app', 'app'] + command,
+                                cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+        assert result.returncode == 0, result.stdout + result.stderr""")
+
+    # tests/test_stats.py
+    create_file(f"{base}/backend/tests/test_stats.py", """import pytest
+
+from app import app
+
+STATS_PATHS = ['/api/cache/stats', '/api/db/stats']
+
+
+@pytest.mark.parametrize('path', STATS_PATHS)
+def test_stats_require_admin(client, path):
+    assert client.get(path).status_code == 401
+
+
+@pytest.mark.parametrize('path', STATS_PATHS)
+def test_stats_for_admin(client, admin_headers, path):
+    assert client.get(path, headers=admin_headers).status_code == 200
+
+
+@pytest.mark.parametrize('path', STATS_PATHS)
+def test_stats_with_metrics_token(client, monkeypatch, path):
+    monkeypatch.setitem(app.config, 'METRICS_TOKEN', 'segredo')
+    assert client.get(path, headers={'Authorization': 'Bearer segredo'}).status_code == 200
+    # Token errado cai na verificação de JWT (422: não é um JWT)
+    assert client.get(path, headers={'Authorization': 'Bearer outro'}).status_code == 422""")
+
+    # tests/test_products.py
+    create_file(f"{base}/backend/tests/test_products.py", """import pytest
+
+from conftest import make_cursor
+
+
+def test_cursor_pages_through_catalog(client):
+    seen = []
+    cursor = None
+    while True:
+        response = client.get('/api/products', query_string={'limit': 2, 'cursor': cursor or ''})
+        assert response.status_code == 200
+        body = response.get_json()
+        seen += [product['id'] for product in body['products']]
+        cursor = body['next_cursor']
+        if not body['has_more']:
+            break
+    assert len(seen) == len(set(seen)) == 6
+
+
+@pytest.mark.parametrize('sort, values', [
+    ('newest', [123, 1]),
+    ('newest', ['2025-01-01T00:00:00', 'abc']),
+    ('price_asc', ['abc', 1]),
+    ('price_asc', [[1], 1]),
+    ('price_desc', [{'price': 1}, 1]),
+    ('price_asc', [100.0, 1.5]),
+    ('price_asc', [True, 1]),
+    ('name', [1, 2]),
+    ('name', ['Blazer', None]),
+])
+def test_tampered_cursor_returns_400(client, sort, values):
+    response = client.get('/api/products', query_string={'sort': sort, 'cursor': make_cursor(values)})
+    assert response.status_code == 400
+    assert response.get_json() == {'message': 'Cursor inválido'}
+
+
+def test_tampered_search_cursor_returns_400(client):
+    response = client.get('/api/products/search', query_string={'q': 'blazer', 'cursor': make_cursor(['10'])})
+    assert response.status_code == 400
+
+
+def listed_ids(client, **args):
+    response = client.get('/api/products', query_string=args)
+    assert response.status_code == 200
+    return {product['id'] for product in response.get_json()['products']}
+
+
+def test_boolean_filters_accept_false(client):
+    everything = listed_ids(client)
+    featured = listed_ids(client, featured='true')
+    assert featured and featured < everything
+    assert listed_ids(client, featured='1') == featured
+    assert listed_ids(client, featured='false') == everything
+    assert listed_ids(client, featured='0', in_stock='false') == everything
+
+
+@pytest.mark.parametrize('args', [
+    {'featured': 'yes'},
+    {'in_stock': 'sim'},
+    {'min_price': 'abc'},
+    {'max_price': 'nan'},
+    {'category_id': '1.5'},
+])
+def test_invalid_filters_return_400(client, args):
+    response = client.get('/api/products', query_string=args)
+    assert response.status_code == 400
+    assert response.get_json()['message'] == f'Parâmetro {next(iter(args))} inválido'
+
+
+@pytest.mark.parametrize('args', [
+    {'cursor': 'abc'},
+    {'limit': '0'},
+    {'sort': 'price'},
+    {'featured': 'yes'},
+])
+def test_current_etag_does_not_hide_invalid_params(client, args):
+    etag = client.get('/api/products').headers['ETag']
+    response = client.get('/api/products', query_string=args, headers={'If-None-Match': etag})
+    assert response.status_code == 400
+
+
+def test_current_etag_returns_304(client):
+    etag = client.get('/api/products').headers['ETag']
+    for args in ({}, {'sort': 'name'}):
+        response = client.get('/api/products', query_string=args, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag""")
 
     # ============ FRONTEND COMPLETO ============
     
@@ -717,12 +4685,67 @@ const api = axios.create({
 // Interceptor para adicionar token de autenticação
 api.interceptors.request.use((config) => {
   const token = localStorage.getItem('token')
-  if (token) {
+  if (token && !config.headers.Authorization) {
     config.headers.Authorization = `Bearer ${token}`
   }
   return config
 })
 
+// O access token dura pouco: em um 401, renova uma vez com o refresh token
+// (uma única renovação em andamento para todas as requisições) e repete
+let refreshing = null
+
+api.interceptors.response.use(undefined, async (error) => {
+  const { config, response } = error
+  const refreshToken = localStorage.getItem('refresh_token')
+  if (!response || response.status !== 401 || !refreshToken || config._retried || config.url === '/auth/refresh') {
+    return Promise.reject(error)
+  }
+  try {
+    refreshing = refreshing || api.post('/auth/refresh', null, {
+      headers: { Authorization: `Bearer ${refreshToken}` },
+    })
+    const { data } = await refreshing
+    localStorage.setItem('token', data.access_token)
+  } catch (refreshError) {
+    localStorage.removeItem('token')
+    localStorage.removeItem('refresh_token')
+    return Promise.reject(error)
+  } finally {
+    refreshing = null
+  }
+  config._retried = true
+  config.headers.Authorization = `Bearer ${localStorage.getItem('token')}`
+  return api(config)
+})
+
+// Sessão: login e cadastro guardam os dois tokens (o refresh é o que o
+// interceptor acima usa); o logout revoga os dois no servidor e limpa o navegador
+function saveSession(data) {
+  localStorage.setItem('token', data.access_token)
+  localStorage.setItem('refresh_token', data.refresh_token)
+  return data.user
+}
+
+export async function login(email, password) {
+  const { data } = await api.post('/auth/login', { email, password })
+  return saveSession(data)
+}
+
+export async function register(name, email, password) {
+  const { data } = await api.post('/auth/register', { name, email, password })
+  return saveSession(data)
+}
+
+export async function logout() {
+  try {
+    await api.post('/auth/logout', { refresh_token: localStorage.getItem('refresh_token') })
+  } finally {
+    localStorage.removeItem('token')
+    localStorage.removeItem('refresh_token')
+  }
+}
+
 export default api""")
 
     # ============ COMPONENTES ============
@@ -930,7 +4953,9 @@ const Home = () => {
   useEffect(() => {
     const fetchFeaturedProducts = async () => {
       try {
-        const response = await api.get('/products?featured=true')
+        const response = await api.get('/products', {
+          params: { featured: true, limit: 3, fields: 'id,name,price,original_price,image_url' }
+        })
         setFeaturedProducts(response.data.products || [])
       } catch (error) {
         console.error('Erro ao carregar produtos:', error)
@@ -1200,40 +5225,87 @@ import { Link, useSearchParams } from 'react-router-dom'
 import { Filter, Grid, List } from 'lucide-react'
 import api from '../lib/api'
 
+const PAGE_SIZE = 24
+
+// Só o que os cards mostram; a descrição aparece apenas na visualização em lista
+const CARD_FIELDS = 'id,name,price,original_price,image_url,stock,category'
+
+const SORT_OPTIONS = [
+  { value: 'newest', label: 'Novidades' },
+  { value: 'price_asc', label: 'Menor preço' },
+  { value: 'price_desc', label: 'Maior preço' },
+  { value: 'name', label: 'Nome' },
+]
+
 const Products = () => {
   const [products, setProducts] = useState([])
   const [categories, setCategories] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [hasMore, setHasMore] = useState(false)
   const [loading, setLoading] = useState(true)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [viewMode, setViewMode] = useState('grid')
+  const [sort, setSort] = useState('newest')
   const [searchParams] = useSearchParams()
 
+  const selectedCategory = searchParams.get('categoria')
+
+  // Filtro e ordenação acontecem no banco; o navegador só recebe a página pedida
+  const fetchProducts = (cursor) =>
+    api.get('/products', {
+      params: {
+        limit: PAGE_SIZE,
+        sort,
+        fields: viewMode === 'list' ? `${CARD_FIELDS},description` : CARD_FIELDS,
+        category: selectedCategory || undefined,
+        cursor: cursor || undefined,
+      }
+    })
+
   useEffect(() => {
-    const fetchData = async () => {
+    const fetchCategories = async () => {
       try {
-        const [productsResponse, categoriesResponse] = await Promise.all([
-          api.get('/products'),
-          api.get('/categories')
-        ])
-        
-        setProducts(productsResponse.data.products || [])
-        setCategories(categoriesResponse.data.categories || [])
+        const response = await api.get('/categories')
+        setCategories(response.data.categories || [])
       } catch (error) {
-        console.error('Erro ao carregar dados:', error)
-      } finally {
-        setLoading(false)
+        console.error('Erro ao carregar categorias:', error)
       }
     }
 
-    fetchData()
+    fetchCategories()
   }, [])
 
-  const selectedCategory = searchParams.get('categoria')
+  useEffect(() => {
+    const fetchFirstPage = async () => {
+      setLoading(true)
+      try {
+        const response = await fetchProducts()
+        setProducts(response.data.products || [])
+        setNextCursor(response.data.next_cursor)
+        setHasMore(response.data.has_more)
+      } catch (error) {
+        console.error('Erro ao carregar produtos:', error)
+      } finally {
+        setLoading(false)
+      }
+    }
 
-  const filteredProducts = selectedCategory
-    ? products.filter(product => 
-        product.category?.slug === selectedCategory
-      )
-    : products
+    fetchFirstPage()
+  }, [selectedCategory, sort, viewMode])
+
+  const loadMore = async () => {
+    setLoadingMore(true)
+    try {
+      const response = await fetchProducts(nextCursor)
+      setProducts(current => [...current, ...(response.data.products || [])])
+      setNextCursor(response.data.next_cursor)
+      setHasMore(response.data.has_more)
+    } catch (error) {
+      console.error('Erro ao carregar produtos:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
 
   if (loading) {
     return (
@@ -1270,7 +5342,7 @@ const Products = () => {
             }
           </h1>
           <p className="text-gray-600">
-            {filteredProducts.length} produto{filteredProducts.length !== 1 ? 's' : ''} encontrado{filteredProducts.length !== 1 ? 's' : ''}
+            {products.length}{hasMore ? '+' : ''} produto{products.length !== 1 ? 's' : ''} encontrado{products.length !== 1 ? 's' : ''}
           </p>
         </div>
 
@@ -1303,6 +5375,15 @@ const Products = () => {
           </div>
 
           <div className="flex items-center space-x-2">
+            <select
+              value={sort}
+              onChange={(e) => setSort(e.target.value)}
+              className="px-3 py-2 rounded-lg text-sm bg-white text-gray-700 border border-gray-300"
+            >
+              {SORT_OPTIONS.map((option) => (
+                <option key={option.value} value={option.value}>{option.label}</option>
+              ))}
+            </select>
             <button
               onClick={() => setViewMode('grid')}
               className={`p-2 rounded-lg ${
@@ -1327,7 +5408,7 @@ const Products = () => {
         </div>
 
         {/* Products Grid */}
-        {filteredProducts.length === 0 ? (
+        {products.length === 0 ? (
           <div className="text-center py-12">
             <p className="text-gray-500 text-lg">Nenhum produto encontrado nesta categoria.</p>
           </div>
@@ -1337,7 +5418,7 @@ const Products = () => {
               ? 'grid-cols-1 md:grid-cols-2 lg:grid-cols-3' 
               : 'grid-cols-1'
           }`}>
-            {filteredProducts.map((product) => (
+            {products.map((product) => (
               <Link key={product.id} to={`/produto/${product.id}`} className="group">
                 <div className={`card overflow-hidden ${
                   viewMode === 'list' ? 'flex flex-col sm:flex-row' : ''
@@ -1393,6 +5474,19 @@ const Products = () => {
             ))}
           </div>
         )}
+
+        {/* Paginação */}
+        {hasMore && (
+          <div className="text-center mt-12">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="btn-secondary disabled:opacity-50"
+            >
+              {loadingMore ? 'Carregando...' : 'Carregar mais'}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   )
@@ -2150,9 +6244,35 @@ export default Contact""")
     print("\n📋 Estrutura completa:")
     print("├── README.md")
     print("├── .gitignore")
+    print("├── .github/workflows/backend.yml")
     print("├── backend/")
     print("│   ├── app.py")
+    print("│   ├── asgi.py")
+    print("│   ├── cache.py")
+    print("│   ├── compression.py")
+    print("│   ├── dbpool.py")
+    print("│   ├── gunicorn.conf.py")
+    print("│   ├── loadtest.py")
+    print("│   ├── metrics.py")
+    print("│   ├── migrations.py")
+    print("│   ├── passwords.py")
+    print("│   ├── profiler.py")
+    print("│   ├── ratelimit.py")
+    print("│   ├── replica.py")
+    print("│   ├── revocation.py")
+    print("│   ├── search.py")
+    print("│   ├── seed.py")
+    print("│   ├── serializers.py")
+    print("│   ├── sqlite_profile.py")
+    print("│   ├── timing.py")
+    print("│   ├── tests/")
+    print("│   │   ├── conftest.py")
+    print("│   │   ├── test_products.py")
+    print("│   │   ├── test_query_checks.py")
+    print("│   │   └── test_stats.py")
+    print("│   ├── pytest.ini")
     print("│   ├── requirements.txt")
+    print("│   ├── requirements-dev.txt")
     print("│   ├── railway.json")
     print("│   └── Procfile")
     print("└── frontend/")